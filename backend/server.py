@@ -1,16 +1,32 @@
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Path, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Literal
 from datetime import datetime, timezone, timedelta
 import os
-from pymongo import MongoClient, DESCENDING, ASCENDING
+from pymongo import MongoClient, DESCENDING, ASCENDING, UpdateOne, UpdateMany, ReturnDocument
+from pymongo.errors import OperationFailure, DuplicateKeyError, BulkWriteError, ConnectionFailure, PyMongoError
+from bson import ObjectId, Binary
 import logging
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict, Counter
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import bcrypt
 import jwt
 import re
+import base64
+import bisect
+import hashlib
+import heapq
+import math
+import random
+import unicodedata
 import httpx
 import ssl
 import certifi
@@ -91,9 +107,12 @@ menu_items = db["menu_items"]
 users = db["users"]
 tv_seasons = db["tv_seasons"]
 tv_episodes = db["tv_episodes"]
+tv_series_meta = db["tv_series_meta"]  # Show status and freshness for the seasons read-through
 user_ratings = db["user_ratings"]
 content_views = db["content_views"]  # Track views for Top 10
 watch_progress = db["watch_progress"]  # Track watch progress per user
+user_title_state = db["user_title_state"]  # List/like/rating/progress per (user, title)
+schema_migrations = db["schema_migrations"]
 
 # JWT Configuration
 JWT_SECRET = os.environ.get("JWT_SECRET", "netflix-admin-super-secret-key-2024")
@@ -102,17 +121,27 @@ JWT_EXPIRATION_HOURS = 24
 
 security = HTTPBearer()
 
+# Sort fields accepted by the admin content list - each one is backed by an index
+CONTENT_SORT_FIELDS = ("createdAt", "release_date", "popularity", "vote_average", "tmdbId")
+
 # Create indexes
-contents.create_index("tmdbId", unique=True)
-contents.create_index([("release_date", DESCENDING)])
-contents.create_index([("popularity", DESCENDING)])
-contents.create_index([("vote_average", DESCENDING)])
-contents.create_index([("createdAt", DESCENDING)])
-contents.create_index("type")
+def create_catalog_indexes(contents_collection, seasons_collection, episodes_collection):
+    """Create catalog indexes - shared by the live and the shadow (rebuild) collections"""
+    contents_collection.create_index("tmdbId", unique=True)
+    # Sort keys of the admin list; tmdbId breaks ties for keyset pagination
+    for field in CONTENT_SORT_FIELDS:
+        if field != "tmdbId":
+            contents_collection.create_index([(field, DESCENDING), ("tmdbId", DESCENDING)])
+    contents_collection.create_index("type")
+    # Admin title search: trigram lookup plus anchored prefix for short queries
+    contents_collection.create_index("title_ngrams")
+    contents_collection.create_index("title_normalized")
+    seasons_collection.create_index([("tmdbId", 1), ("season_number", 1)], unique=True)
+    episodes_collection.create_index([("tmdbId", 1), ("season_number", 1), ("episode_number", 1)], unique=True)
+
+create_catalog_indexes(contents, tv_seasons, tv_episodes)
 admin_users.create_index("email", unique=True)
 menu_items.create_index("order")
-tv_seasons.create_index([("tmdbId", 1), ("season_number", 1)], unique=True)
-tv_episodes.create_index([("tmdbId", 1), ("season_number", 1), ("episode_number", 1)], unique=True)
 watch_progress.create_index([("user_id", 1), ("tmdb_id", 1)], unique=True)
 watch_progress.create_index([("user_id", 1), ("updated_at", DESCENDING)])
 
@@ -195,6 +224,143 @@ def sanitize_string(s: str) -> str:
         return s
     return re.sub(r'<[^>]*>', '', s)
 
+def normalize_title(s: str) -> str:
+    """Lowercase, strip accents and punctuation so 'Là-bas' and 'la bas' compare equal"""
+    if not s:
+        return ""
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    s = re.sub(r"[^\w]+", " ", s.lower())
+    return " ".join(s.split())
+
+def title_trigrams(s: str) -> List[str]:
+    """Character trigrams of a normalized string"""
+    return sorted({s[i:i + 3] for i in range(len(s) - 2)})
+
+def title_search_fields(title: Optional[str], original_title: Optional[str]) -> dict:
+    """Fields indexed for admin title search"""
+    normalized = []
+    for value in (title, original_title):
+        value = normalize_title(value)
+        if value and value not in normalized:
+            normalized.append(value)
+    ngrams = set()
+    for value in normalized:
+        ngrams.update(title_trigrams(value))
+    return {"title_normalized": normalized, "title_ngrams": sorted(ngrams)}
+
+def encode_cursor(data: dict) -> str:
+    """Encode pagination state as an opaque URL-safe token"""
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a token produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if not isinstance(data, dict):
+            raise ValueError("cursor must encode an object")
+        return data
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+class TTLCache:
+    """Thread-safe, size-bounded in-process cache with a per-entry TTL and hit/miss counters"""
+
+    def __init__(self, ttl_seconds: float, max_size: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxSize": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+# Background jobs: periodic callables started with the app; shutdown hooks run on stop
+# (used by the in-memory write buffers to flush what they still hold)
+periodic_jobs = []
+shutdown_hooks = []
+background_tasks = []
+
+def register_periodic_job(fn, interval_seconds: float, flush_on_shutdown: bool = True):
+    """Run fn every interval_seconds while the app is up (sync fns run in a worker thread)"""
+    periodic_jobs.append((fn, interval_seconds))
+    if flush_on_shutdown:
+        shutdown_hooks.append(fn)
+
+async def call_job(fn):
+    if asyncio.iscoroutinefunction(fn):
+        return await fn()
+    return await asyncio.to_thread(fn)
+
+async def run_periodically(fn, interval_seconds: float):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await call_job(fn)
+        except Exception as e:
+            logger.error(f"Background job {fn.__name__} failed: {e}")
+
+@app.on_event("startup")
+async def start_background_jobs():
+    for fn, interval_seconds in periodic_jobs:
+        background_tasks.append(asyncio.create_task(run_periodically(fn, interval_seconds)))
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    for task in background_tasks:
+        task.cancel()
+    for fn in shutdown_hooks:
+        try:
+            await call_job(fn)
+        except Exception as e:
+            logger.error(f"Shutdown hook {fn.__name__} failed: {e}")
+
+# Principals resolved from JWTs are cached briefly so authenticated hot paths
+# (e.g. watch-progress heartbeats) skip the users/admin_users lookup
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.environ.get("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.environ.get("PRINCIPAL_CACHE_MAX_SIZE", "10000"))
+principal_cache = TTLCache(PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_SIZE)
+
 def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verify JWT token and return admin user"""
     try:
@@ -203,24 +369,336 @@ def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(securi
         email = payload.get("email")
         if not email:
             raise HTTPException(status_code=401, detail="Invalid token")
-        admin = admin_users.find_one({"email": email}, {"_id": 0, "password": 0})
-        if not admin:
-            raise HTTPException(status_code=401, detail="Admin not found")
-        return admin
+        admin = principal_cache.get(("admin", email))
+        if admin is None:
+            admin = admin_users.find_one({"email": email}, {"_id": 0, "password": 0})
+            if not admin:
+                raise HTTPException(status_code=401, detail="Admin not found")
+            principal_cache.set(("admin", email), admin)
+        return dict(admin)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# Admin audit log: entries are buffered in memory and written with insert_many,
+# either every ADMIN_LOG_FLUSH_INTERVAL_SECONDS or as soon as a batch fills up.
+# Entries that fail to insert are put back and retried on the next flush (their _id is
+# assigned client-side, so a retry of an entry that did land is a harmless duplicate
+# key); only past ADMIN_LOG_MAX_PENDING buffered entries are the oldest dropped.
+ADMIN_LOG_FLUSH_INTERVAL_SECONDS = float(os.environ.get("ADMIN_LOG_FLUSH_INTERVAL_SECONDS", "2"))
+ADMIN_LOG_BATCH_SIZE = int(os.environ.get("ADMIN_LOG_BATCH_SIZE", "100"))
+ADMIN_LOG_MAX_PENDING = int(os.environ.get("ADMIN_LOG_MAX_PENDING", "10000"))
+ADMIN_LOG_RETENTION_DAYS = int(os.environ.get("ADMIN_LOG_RETENTION_DAYS", "90"))  # 0 = keep forever
+
+class AdminAuditWriter:
+    """Buffers admin log entries and writes them in batches"""
+
+    def __init__(self, collection, batch_size: int, max_pending: int = ADMIN_LOG_MAX_PENDING):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._buffer = []
+        self._lock = threading.Lock()
+        self.written = 0
+        self.requeued = 0
+        self.dropped = 0
+
+    def add(self, entry: dict):
+        with self._lock:
+            self._buffer.append(entry)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def _not_inserted(self, batch: List[dict]) -> List[dict]:
+        """Insert batch; returns the entries that are not in the collection afterwards"""
+        try:
+            self.collection.insert_many(batch, ordered=False)
+            return []
+        except BulkWriteError as e:
+            return [
+                batch[error["index"]]
+                for error in e.details.get("writeErrors", [])
+                if error.get("code") != 11000  # already written by an earlier attempt
+            ]
+        except ConnectionFailure:
+            return batch
+        except Exception as e:
+            # Nothing was sent (e.g. an entry BSON can't encode): write them one by one
+            # so a single bad entry neither blocks nor takes down the rest
+            logger.error(f"Admin log batch rejected, writing {len(batch)} entries one by one: {e}")
+            failed = []
+            for entry in batch:
+                try:
+                    self.collection.insert_one(entry)
+                except DuplicateKeyError:
+                    pass
+                except ConnectionFailure:
+                    failed.append(entry)
+                except Exception as entry_error:
+                    self.dropped += 1
+                    logger.error(f"Dropping admin log entry {entry.get('action')}: {entry_error}")
+            return failed
+
+    def flush(self) -> int:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+        failed = self._not_inserted(batch)
+        self.written += len(batch) - len(failed)
+        if failed:
+            logger.error(f"Failed to write {len(failed)} admin log entries, requeueing")
+            with self._lock:
+                self._buffer = failed + self._buffer
+                self.requeued += len(failed)
+                overflow = len(self._buffer) - self.max_pending
+                if overflow > 0:
+                    del self._buffer[:overflow]
+                    self.dropped += overflow
+            if overflow > 0:
+                logger.error(f"Admin log buffer full: dropped the {overflow} oldest entries")
+        return len(batch)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._buffer)
+        return {"pending": pending, "written": self.written, "requeued": self.requeued, "dropped": self.dropped}
+
+admin_audit = AdminAuditWriter(admin_logs, ADMIN_LOG_BATCH_SIZE)
+register_periodic_job(admin_audit.flush, ADMIN_LOG_FLUSH_INTERVAL_SECONDS)
+
+def ensure_admin_log_indexes():
+    """Indexes for the log viewer plus the retention TTL; converts legacy ISO-string timestamps"""
+    try:
+        admin_logs.update_many(
+            {"timestamp": {"$type": "string"}},
+            [{"$set": {"timestamp": {"$dateFromString": {"dateString": "$timestamp"}}}}]
+        )
+    except Exception as e:
+        logger.warning(f"Could not convert admin log timestamps: {e}")
+    
+    admin_logs.create_index([("timestamp", DESCENDING), ("_id", DESCENDING)])
+    admin_logs.create_index([("action", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)])
+    
+    ttl_options = {}
+    if ADMIN_LOG_RETENTION_DAYS > 0:
+        ttl_options["expireAfterSeconds"] = ADMIN_LOG_RETENTION_DAYS * 86400
+    try:
+        admin_logs.create_index("timestamp", **ttl_options)
+    except OperationFailure:
+        # Retention changed since the index was built
+        admin_logs.drop_index("timestamp_1")
+        admin_logs.create_index("timestamp", **ttl_options)
+
+ensure_admin_log_indexes()
+
 def log_admin_action(action: str, content_id: Optional[str] = None, metadata: Optional[dict] = None):
     """Log admin action"""
-    admin_logs.insert_one({
+    admin_audit.add({
         "action": action,
         "contentId": content_id,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": datetime.now(timezone.utc),
         "metadata": metadata or {}
     })
 
+# Password hashing runs on a bounded worker pool so bcrypt never blocks the event loop.
+# Hashes with a cost other than BCRYPT_ROUNDS are upgraded on the next successful login.
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "4"))
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+password_hash_stats = {
+    "hash": {"count": 0, "totalMs": 0.0, "maxMs": 0.0},
+    "verify": {"count": 0, "totalMs": 0.0, "maxMs": 0.0}
+}
+password_hash_stats_lock = threading.Lock()
+
+def record_password_hash_latency(kind: str, elapsed_ms: float):
+    with password_hash_stats_lock:
+        stats = password_hash_stats[kind]
+        stats["count"] += 1
+        stats["totalMs"] += elapsed_ms
+        stats["maxMs"] = max(stats["maxMs"], elapsed_ms)
+
+def _hash_password_sync(password: str) -> str:
+    started = time.perf_counter()
+    hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
+    record_password_hash_latency("hash", (time.perf_counter() - started) * 1000)
+    return hashed
+
+def _verify_password_sync(password: str, hashed: str) -> bool:
+    started = time.perf_counter()
+    valid = bcrypt.checkpw(password.encode(), hashed.encode())
+    record_password_hash_latency("verify", (time.perf_counter() - started) * 1000)
+    return valid
+
+# Hash operations beyond this many in flight are refused with 429 instead of queueing
+PASSWORD_HASH_MAX_INFLIGHT = int(os.environ.get("PASSWORD_HASH_MAX_INFLIGHT", str(PASSWORD_HASH_WORKERS * 2)))
+password_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_INFLIGHT)
+admission_stats = {"rateLimited": 0, "hashRejected": 0}
+
+async def run_password_job(fn, *args):
+    if not password_hash_slots.acquire(blocking=False):
+        admission_stats["hashRejected"] += 1
+        raise HTTPException(
+            status_code=429,
+            detail="Server busy, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, fn, *args)
+    finally:
+        password_hash_slots.release()
+
+async def hash_password(password: str) -> str:
+    """bcrypt-hash a password on the password worker pool"""
+    return await run_password_job(_hash_password_sync, password)
+
+async def verify_password(password: str, hashed: str) -> bool:
+    """Check a password against a bcrypt hash on the password worker pool"""
+    return await run_password_job(_verify_password_sync, password, hashed)
+
+def password_needs_rehash(hashed: str) -> bool:
+    """True when a bcrypt hash ($2b$<cost>$...) was made with a different cost"""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+def get_password_hash_stats() -> dict:
+    with password_hash_stats_lock:
+        result = {"rounds": BCRYPT_ROUNDS, "workers": PASSWORD_HASH_WORKERS}
+        for kind, stats in password_hash_stats.items():
+            result[kind] = {
+                "count": stats["count"],
+                "avgMs": round(stats["totalMs"] / stats["count"], 2) if stats["count"] else 0.0,
+                "maxMs": round(stats["maxMs"], 2)
+            }
+        return result
+
+# Admission control for the authentication endpoints: token buckets per client IP
+# and per (client IP, account), kept in memory or (AUTH_RATE_LIMIT_STORE=mongo) shared
+# via Mongo. The account token is given back when the credentials check out, so only
+# failed attempts count against an account, and only from the IP that made them:
+# nobody else can lock a user out by naming their email.
+AUTH_RATE_LIMIT_STORE = os.environ.get("AUTH_RATE_LIMIT_STORE", "memory")
+AUTH_IP_RATE_PER_SECOND = float(os.environ.get("AUTH_IP_RATE_PER_SECOND", "0.5"))
+AUTH_IP_BURST = float(os.environ.get("AUTH_IP_BURST", "20"))
+AUTH_ACCOUNT_RATE_PER_SECOND = float(os.environ.get("AUTH_ACCOUNT_RATE_PER_SECOND", str(1 / 60)))
+AUTH_ACCOUNT_BURST = float(os.environ.get("AUTH_ACCOUNT_BURST", "5"))
+TRUST_PROXY_HEADERS = os.environ.get("TRUST_PROXY_HEADERS", "false").lower() == "true"
+auth_rate_limits = db["auth_rate_limits"]
+auth_rate_limits.create_index("expireAt", expireAfterSeconds=0)
+
+class TokenBucketLimiter:
+    """Token buckets keyed by string; consume() returns 0 when allowed, else seconds to wait"""
+
+    def __init__(self, name: str, rate_per_second: float, burst: float, collection=None, max_keys: int = 100000):
+        self.name = name
+        self.rate = rate_per_second
+        self.burst = burst
+        self.collection = collection
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str) -> float:
+        if self.collection is not None:
+            try:
+                return self._consume_shared(key)
+            except Exception as e:
+                logger.warning(f"Shared rate limit store unavailable, using local buckets: {e}")
+        return self._consume_local(key)
+
+    def _consume_local(self, key: str) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return 0.0 if allowed else (1 - tokens) / self.rate
+
+    def _consume_shared(self, key: str) -> float:
+        # Refill and take a token in one atomic pipeline update, using the server clock
+        elapsed_seconds = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updatedAt", "$$NOW"]}]}, 1000]}
+        refill_ms = int(self.burst / self.rate * 1000)
+        bucket = self.collection.find_one_and_update(
+            {"_id": f"{self.name}:{key}"},
+            [
+                {"$set": {
+                    "tokens": {"$min": [
+                        self.burst,
+                        {"$add": [{"$ifNull": ["$tokens", self.burst]}, {"$multiply": [elapsed_seconds, self.rate]}]}
+                    ]},
+                    "updatedAt": "$$NOW"
+                }},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expireAt": {"$add": ["$$NOW", refill_ms]}
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return 0.0 if bucket["allowed"] else (1 - bucket["tokens"]) / self.rate
+
+    def refund(self, key: str):
+        """Give back a token taken by consume() for an attempt that turned out fine"""
+        if self.collection is not None:
+            try:
+                self.collection.update_one(
+                    {"_id": f"{self.name}:{key}"},
+                    [{"$set": {"tokens": {"$min": [self.burst, {"$add": [{"$ifNull": ["$tokens", self.burst]}, 1]}]}}}]
+                )
+                return
+            except Exception as e:
+                logger.warning(f"Shared rate limit store unavailable, using local buckets: {e}")
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                self._buckets[key] = (min(self.burst, tokens + 1), updated)
+
+shared_rate_limit_store = auth_rate_limits if AUTH_RATE_LIMIT_STORE == "mongo" else None
+auth_ip_limiter = TokenBucketLimiter("ip", AUTH_IP_RATE_PER_SECOND, AUTH_IP_BURST, shared_rate_limit_store)
+auth_account_limiter = TokenBucketLimiter("account", AUTH_ACCOUNT_RATE_PER_SECOND, AUTH_ACCOUNT_BURST, shared_rate_limit_store)
+
+def get_client_ip(request: Request) -> str:
+    if TRUST_PROXY_HEADERS:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+def enforce_auth_rate_limits(request: Request, account: str) -> str:
+    """Reject with 429 when the client IP, or its attempts on this account, are over budget;
+    returns the account bucket key for release_auth_attempt"""
+    client_ip = get_client_ip(request)
+    account_key = f"{client_ip}|{account.lower()}"
+    wait_seconds = max(
+        auth_ip_limiter.consume(client_ip),
+        auth_account_limiter.consume(account_key)
+    )
+    if wait_seconds > 0:
+        admission_stats["rateLimited"] += 1
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts, please retry later",
+            headers={"Retry-After": str(int(wait_seconds) + 1)}
+        )
+    return account_key
+
+def release_auth_attempt(account_key: str):
+    """The attempt succeeded: don't count it against the account"""
+    auth_account_limiter.refund(account_key)
+
 # Anime genre IDs to exclude (Animation genre often contains anime)
 # We exclude content that is primarily Japanese animation
 ANIME_GENRE_ID = 16  # Animation genre
@@ -255,14 +733,51 @@ async def fetch_tmdb_data(endpoint: str, params: dict = None) -> dict:
     async with httpx.AsyncClient() as client:
         response = await client.get(f"{TMDB_BASE_URL}{endpoint}", params=params)
         if response.status_code == 200:
-            return response.json()
+            data = response.json()
+            catalog_search_index.observe_tmdb(endpoint, data)
+            return data
         logger.error(f"TMDB API error: {response.status_code} - {response.text}")
         return None
 
-async def check_vixsrc_availability(tmdb_id: int, content_type: str) -> dict:
+# Title details change rarely; concurrent callers asking for the same title share
+# one in-flight TMDB request
+TMDB_DETAILS_CACHE_TTL_SECONDS = float(os.environ.get("TMDB_DETAILS_CACHE_TTL_SECONDS", "3600"))
+tmdb_details_cache = TTLCache(TMDB_DETAILS_CACHE_TTL_SECONDS, max_size=5000)
+tmdb_details_inflight = {}
+
+async def fetch_tmdb_details(media_type: str, tmdb_id: int) -> Optional[dict]:
+    """Cached /{media_type}/{tmdb_id} lookup; failures are not cached"""
+    key = (media_type, tmdb_id)
+    cached = tmdb_details_cache.get(key)
+    if cached is not None:
+        return cached
+    pending = tmdb_details_inflight.get(key)
+    if pending is None:
+        pending = asyncio.ensure_future(fetch_tmdb_data(f"/{media_type}/{tmdb_id}"))
+        tmdb_details_inflight[key] = pending
+        pending.add_done_callback(lambda _: tmdb_details_inflight.pop(key, None))
+    data = await asyncio.shield(pending)
+    if data:
+        tmdb_details_cache.set(key, data)
+    return data
+
+async def probe_vixsrc_url(client: httpx.AsyncClient, url: str) -> bool:
+    """HEAD the vixsrc URL, falling back to GET when HEAD is not conclusive"""
+    response = await client.head(url)
+    if response.status_code == 200:
+        return True
+    response = await client.get(url)
+    return response.status_code == 200 and "not found" not in response.text.lower()
+
+async def check_vixsrc_availability(
+    tmdb_id: int,
+    content_type: str,
+    http_client: Optional[httpx.AsyncClient] = None
+) -> dict:
     """
     Check if content is available on vixsrc.to
-    Returns dict with available status and source_url
+    Returns dict with available status and source_url.
+    Pass a shared http_client to reuse connections across many checks.
     """
     now = datetime.now(timezone.utc)
     now_iso = now.isoformat()
@@ -276,14 +791,11 @@ async def check_vixsrc_availability(tmdb_id: int, content_type: str) -> dict:
     is_available = False
     
     try:
-        async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-            response = await client.head(url)
-            if response.status_code == 200:
-                is_available = True
-            else:
-                response = await client.get(url)
-                if response.status_code == 200 and "not found" not in response.text.lower():
-                    is_available = True
+        if http_client is not None:
+            is_available = await probe_vixsrc_url(http_client, url)
+        else:
+            async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
+                is_available = await probe_vixsrc_url(client, url)
     except Exception as e:
         logger.warning(f"Vixsrc check failed for {tmdb_id}: {e}")
     
@@ -405,6 +917,8 @@ async def import_content_from_tmdb(tmdb_id: int, content_type: str, check_vixsrc
         "updatedAt": now
     }
     
+    content.update(title_search_fields(content["title"], content["original_title"]))
+    
     # For TV shows, add additional fields
     if content_type == "tv":
         content["number_of_seasons"] = data.get("number_of_seasons", 0)
@@ -417,13 +931,19 @@ async def import_content_from_tmdb(tmdb_id: int, content_type: str, check_vixsrc
     
     return content
 
-async def import_tv_seasons_episodes(tmdb_id: int) -> dict:
+async def import_tv_seasons_episodes(
+    tmdb_id: int,
+    seasons_collection=tv_seasons,
+    episodes_collection=tv_episodes
+) -> dict:
     """Import all seasons and episodes for a TV show from TMDB"""
     # First get TV show details to know number of seasons
     tv_data = await fetch_tmdb_data(f"/tv/{tmdb_id}")
     if not tv_data:
         return {"success": False, "error": "TV show not found"}
     
+    store_tv_series_meta(tv_data)
+    
     seasons_imported = 0
     episodes_imported = 0
     
@@ -439,29 +959,100 @@ async def import_tv_seasons_episodes(tmdb_id: int) -> dict:
         if not season_data:
             continue
         
-        # Save season
-        season_doc = {
+        episodes_imported += store_tv_season(
+            tmdb_id, season_number, season_data, seasons_collection, episodes_collection
+        )
+        seasons_imported += 1
+    
+    return {
+        "success": True,
+        "seasons_imported": seasons_imported,
+        "episodes_imported": episodes_imported
+    }
+
+def store_tv_series_meta(tv_data: dict):
+    """Remember show status and season count, used to decide when local season data is stale"""
+    tv_series_meta.update_one(
+        {"tmdbId": tv_data["id"]},
+        {"$set": {
+            "tmdbId": tv_data["id"],
+            "name": tv_data.get("name"),
+            "status": tv_data.get("status"),
+            "in_production": tv_data.get("in_production", False),
+            "season_count": sum(1 for season in tv_data.get("seasons", []) if season.get("season_number")),
+            "fetchedAt": datetime.now(timezone.utc).isoformat()
+        }},
+        upsert=True
+    )
+
+def tv_season_summaries(tmdb_id: int, tv_data: dict) -> List[dict]:
+    """Season documents (without episodes) from a TMDB show payload, specials excluded"""
+    now = datetime.now(timezone.utc).isoformat()
+    return [
+        {
+            "tmdbId": tmdb_id,
+            "season_number": season["season_number"],
+            "name": season.get("name"),
+            "overview": season.get("overview"),
+            "poster_path": season.get("poster_path"),
+            "air_date": season.get("air_date"),
+            "episode_count": season.get("episode_count", 0),
+            "vote_average": season.get("vote_average", 0),
+            "updatedAt": now
+        }
+        for season in tv_data.get("seasons", [])
+        if season.get("season_number")
+    ]
+
+def store_tv_season_summaries(
+    tmdb_id: int,
+    tv_data: dict,
+    seasons_collection=tv_seasons,
+    episodes_collection=tv_episodes
+):
+    """Upsert the season list of a show and delete seasons TMDB no longer lists;
+    episode data of the remaining seasons is left alone"""
+    summaries = tv_season_summaries(tmdb_id, tv_data)
+    operations = [
+        UpdateOne({"tmdbId": tmdb_id, "season_number": summary["season_number"]}, {"$set": summary}, upsert=True)
+        for summary in summaries
+    ]
+    if operations:
+        seasons_collection.bulk_write(operations, ordered=False)
+        removed = {"tmdbId": tmdb_id, "season_number": {"$gt": 0, "$nin": [summary["season_number"] for summary in summaries]}}
+        seasons_collection.delete_many(removed)
+        episodes_collection.delete_many(removed)
+
+def store_tv_season(
+    tmdb_id: int,
+    season_number: int,
+    season_data: dict,
+    seasons_collection=tv_seasons,
+    episodes_collection=tv_episodes
+) -> int:
+    """Upsert one season and its episodes from a TMDB season payload; returns episodes stored"""
+    now = datetime.now(timezone.utc).isoformat()
+    episodes = season_data.get("episodes", [])
+    seasons_collection.update_one(
+        {"tmdbId": tmdb_id, "season_number": season_number},
+        {"$set": {
             "tmdbId": tmdb_id,
             "season_number": season_number,
             "name": season_data.get("name"),
             "overview": season_data.get("overview"),
             "poster_path": season_data.get("poster_path"),
             "air_date": season_data.get("air_date"),
-            "episode_count": len(season_data.get("episodes", [])),
+            "episode_count": len(episodes),
             "vote_average": season_data.get("vote_average", 0),
-            "updatedAt": datetime.now(timezone.utc).isoformat()
-        }
-        
-        tv_seasons.update_one(
-            {"tmdbId": tmdb_id, "season_number": season_number},
-            {"$set": season_doc},
-            upsert=True
-        )
-        seasons_imported += 1
-        
-        # Save episodes
-        for ep in season_data.get("episodes", []):
-            episode_doc = {
+            "updatedAt": now,
+            "episodesFetchedAt": now
+        }},
+        upsert=True
+    )
+    operations = [
+        UpdateOne(
+            {"tmdbId": tmdb_id, "season_number": season_number, "episode_number": ep.get("episode_number")},
+            {"$set": {
                 "tmdbId": tmdb_id,
                 "season_number": season_number,
                 "episode_number": ep.get("episode_number"),
@@ -472,21 +1063,21 @@ async def import_tv_seasons_episodes(tmdb_id: int) -> dict:
                 "runtime": ep.get("runtime"),
                 "vote_average": ep.get("vote_average", 0),
                 "vote_count": ep.get("vote_count", 0),
-                "updatedAt": datetime.now(timezone.utc).isoformat()
-            }
-            
-            tv_episodes.update_one(
-                {"tmdbId": tmdb_id, "season_number": season_number, "episode_number": ep.get("episode_number")},
-                {"$set": episode_doc},
-                upsert=True
-            )
-            episodes_imported += 1
-    
-    return {
-        "success": True,
-        "seasons_imported": seasons_imported,
-        "episodes_imported": episodes_imported
-    }
+                "updatedAt": now
+            }},
+            upsert=True
+        )
+        for ep in episodes
+    ]
+    if operations:
+        episodes_collection.bulk_write(operations, ordered=False)
+    # The payload is the whole season: episodes TMDB dropped go too
+    episodes_collection.delete_many({
+        "tmdbId": tmdb_id,
+        "season_number": season_number,
+        "episode_number": {"$nin": [ep.get("episode_number") for ep in episodes]}
+    })
+    return len(operations)
 
 def format_italian_date(date_str: str) -> str:
     """Convert date string to Italian format (es. 15 Gennaio 2024)"""
@@ -508,7 +1099,7 @@ def init_default_admin():
     """Create default admin if not exists"""
     existing = admin_users.find_one({"email": "admin@admin.com"})
     if not existing:
-        hashed = bcrypt.hashpw("admin123".encode(), bcrypt.gensalt())
+        hashed = bcrypt.hashpw("admin123".encode(), bcrypt.gensalt(BCRYPT_ROUNDS))
         admin_users.insert_one({
             "email": "admin@admin.com",
             "password": hashed.decode(),
@@ -536,9 +1127,27 @@ def init_default_sections():
             sections.insert_one(section)
         logger.info("Default sections created - Admin can modify these from the panel")
 
+def backfill_title_search_fields():
+    """Add title search fields to contents imported before they existed"""
+    operations = []
+    for item in contents.find(
+        {"title_ngrams": {"$exists": False}},
+        {"_id": 0, "tmdbId": 1, "title": 1, "original_title": 1}
+    ):
+        operations.append(UpdateOne(
+            {"tmdbId": item["tmdbId"]},
+            {"$set": title_search_fields(item.get("title"), item.get("original_title"))}
+        ))
+        if len(operations) >= 500:
+            contents.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        contents.bulk_write(operations, ordered=False)
+
 # Initialize defaults on startup
 init_default_admin()
 init_default_sections()
+backfill_title_search_fields()
 
 # Health Check
 @app.get("/api/health")
@@ -550,14 +1159,26 @@ def health_check():
 # =====================
 
 @app.post("/api/admin/login")
-def admin_login(data: AdminLogin):
+async def admin_login(data: AdminLogin, request: Request):
     """Admin login endpoint"""
-    admin = admin_users.find_one({"email": data.email})
+    attempt = await asyncio.to_thread(enforce_auth_rate_limits, request, f"admin:{data.email}")
+    admin = await asyncio.to_thread(admin_users.find_one, {"email": data.email})
     if not admin:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not bcrypt.checkpw(data.password.encode(), admin["password"].encode()):
+    if not await verify_password(data.password, admin["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    await asyncio.to_thread(release_auth_attempt, attempt)
+    
+    if password_needs_rehash(admin["password"]):
+        try:
+            await asyncio.to_thread(
+                admin_users.update_one,
+                {"email": admin["email"]},
+                {"$set": {"password": await hash_password(data.password)}}
+            )
+        except HTTPException:
+            pass  # Pool busy - upgrade on a later login
     
     payload = {
         "email": admin["email"],
@@ -583,9 +1204,19 @@ def get_admin_profile(admin = Depends(get_current_admin)):
 # CONTENT MANAGEMENT ENDPOINTS
 # =====================
 
+# A catalog rebuild swaps whole collections in at the end, so any write to contents,
+# tv_seasons or tv_episodes made meanwhile would be lost: catalog mutations are
+# refused with 409 while one runs
+catalog_rebuild = {"running": False, "startedAt": None}
+
+def ensure_catalog_writable():
+    if catalog_rebuild["running"]:
+        raise HTTPException(status_code=409, detail="Catalog rebuild in progress, retry when it finishes")
+
 @app.post("/api/admin/contents")
 async def create_content(data: ContentCreate, admin = Depends(get_current_admin)):
     """Add new content to managed list - imports from TMDB and verifies vixsrc availability"""
+    ensure_catalog_writable()
     existing = contents.find_one({"tmdbId": data.tmdbId})
     if existing:
         raise HTTPException(status_code=400, detail="Content already exists")
@@ -607,6 +1238,7 @@ async def create_content(data: ContentCreate, admin = Depends(get_current_admin)
         import_result = await import_tv_seasons_episodes(data.tmdbId)
         logger.info(f"Imported TV show {data.tmdbId}: {import_result}")
     
+    stats_cache.clear()
     log_admin_action("CREATE_CONTENT", str(data.tmdbId), {
         "type": data.type,
         "vixsrc_available": content.get("vixsrc_available", False)
@@ -616,45 +1248,101 @@ async def create_content(data: ContentCreate, admin = Depends(get_current_admin)
     content.pop("_id", None)
     return {"success": True, "content": content, "vixsrc_available": content.get("vixsrc_available", False)}
 
+def content_keyset_filter(sort_by: str, sort_order: str, cursor: dict) -> dict:
+    """Filter selecting the rows after cursor for a (sort_by, tmdbId) ordering"""
+    value = cursor.get("v")
+    last_id = cursor.get("id")
+    if sort_by == "tmdbId":
+        return {"tmdbId": {"$lt" if sort_order == "desc" else "$gt": last_id}}
+    
+    # Missing/null sort values order before everything else, so they come last in desc
+    if sort_order == "desc":
+        if value is None:
+            return {sort_by: None, "tmdbId": {"$lt": last_id}}
+        return {"$or": [
+            {sort_by: {"$lt": value}},
+            {sort_by: value, "tmdbId": {"$lt": last_id}},
+            {sort_by: None}
+        ]}
+    if value is None:
+        return {"$or": [
+            {sort_by: None, "tmdbId": {"$gt": last_id}},
+            {sort_by: {"$ne": None}}
+        ]}
+    return {"$or": [
+        {sort_by: {"$gt": value}},
+        {sort_by: value, "tmdbId": {"$gt": last_id}}
+    ]}
+
 @app.get("/api/admin/contents")
 def get_contents(
     available: Optional[bool] = None,
     type: Optional[str] = None,
     search: Optional[str] = None,
     page: int = 1,
-    limit: int = 20,
+    limit: int = Query(20, ge=1, le=100),
     sort_by: str = "createdAt",
-    sort_order: str = "desc",
+    sort_order: Literal["asc", "desc"] = "desc",
+    cursor: Optional[str] = None,
     admin = Depends(get_current_admin)
 ):
-    """Get all managed contents with filters and sorting"""
-    query = {}
+    """
+    Get all managed contents with filters and sorting.
+    Pass back nextCursor as cursor for keyset pagination; page is kept for older clients.
+    """
+    if sort_by not in CONTENT_SORT_FIELDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"sort_by must be one of: {', '.join(CONTENT_SORT_FIELDS)}"
+        )
+    
+    conditions = []
     if available is not None:
-        query["available"] = available
+        conditions.append({"available": available})
     if type:
-        query["type"] = type
+        conditions.append({"type": type})
     if search:
-        query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"original_title": {"$regex": search, "$options": "i"}}
-        ]
-    
-    total = contents.count_documents(query)
-    skip = (page - 1) * limit
+        term = normalize_title(search)
+        if len(term) >= 3:
+            # Trigrams narrow the candidates through the index, the regex confirms the substring
+            conditions.append({"title_ngrams": {"$all": title_trigrams(term)}})
+            conditions.append({"title_normalized": {"$regex": re.escape(term)}})
+        elif term:
+            conditions.append({"title_normalized": {"$regex": f"^{re.escape(term)}"}})
+    query = {"$and": conditions} if conditions else {}
     
     sort_direction = DESCENDING if sort_order == "desc" else ASCENDING
-    items = list(contents.find(query, {"_id": 0}).sort(sort_by, sort_direction).skip(skip).limit(limit))
+    sort_spec = [(sort_by, sort_direction)]
+    if sort_by != "tmdbId":
+        sort_spec.append(("tmdbId", sort_direction))
+    
+    if cursor:
+        page_query = {"$and": conditions + [content_keyset_filter(sort_by, sort_order, decode_cursor(cursor))]}
+        items = list(contents.find(page_query, {"_id": 0, "title_ngrams": 0}).sort(sort_spec).limit(limit))
+        total = None
+    else:
+        total = contents.count_documents(query) if query else contents.estimated_document_count()
+        skip = (page - 1) * limit
+        items = list(contents.find(query, {"_id": 0, "title_ngrams": 0}).sort(sort_spec).skip(skip).limit(limit))
+    
+    next_cursor = None
+    if len(items) == limit:
+        last = items[-1]
+        next_cursor = encode_cursor({"v": last.get(sort_by), "id": last["tmdbId"]})
     
     # Add formatted Italian date
     for item in items:
         item["release_date_it"] = format_italian_date(item.get("release_date"))
     
-    return {
+    response = {
         "items": items,
         "total": total,
-        "page": page,
-        "totalPages": (total + limit - 1) // limit
+        "nextCursor": next_cursor
     }
+    if total is not None:
+        response["page"] = page
+        response["totalPages"] = (total + limit - 1) // limit
+    return response
 
 @app.get("/api/admin/contents/{tmdb_id}")
 def get_content(tmdb_id: int, admin = Depends(get_current_admin)):
@@ -668,6 +1356,7 @@ def get_content(tmdb_id: int, admin = Depends(get_current_admin)):
 @app.put("/api/admin/contents/{tmdb_id}")
 def update_content(tmdb_id: int, data: ContentUpdate, admin = Depends(get_current_admin)):
     """Update content availability or season"""
+    ensure_catalog_writable()
     content = contents.find_one({"tmdbId": tmdb_id})
     if not content:
         raise HTTPException(status_code=404, detail="Content not found")
@@ -679,6 +1368,7 @@ def update_content(tmdb_id: int, data: ContentUpdate, admin = Depends(get_curren
         update_data["availableSeason"] = data.availableSeason
     
     contents.update_one({"tmdbId": tmdb_id}, {"$set": update_data})
+    stats_cache.clear()
     log_admin_action("UPDATE_CONTENT", str(tmdb_id), update_data)
     
     return {"success": True}
@@ -686,6 +1376,7 @@ def update_content(tmdb_id: int, data: ContentUpdate, admin = Depends(get_curren
 @app.delete("/api/admin/contents/{tmdb_id}")
 def delete_content(tmdb_id: int, admin = Depends(get_current_admin)):
     """Delete content from managed list"""
+    ensure_catalog_writable()
     result = contents.delete_one({"tmdbId": tmdb_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Content not found")
@@ -694,6 +1385,7 @@ def delete_content(tmdb_id: int, admin = Depends(get_current_admin)):
     tv_seasons.delete_many({"tmdbId": tmdb_id})
     tv_episodes.delete_many({"tmdbId": tmdb_id})
     
+    stats_cache.clear()
     log_admin_action("DELETE_CONTENT", str(tmdb_id))
     
     return {"success": True}
@@ -701,6 +1393,7 @@ def delete_content(tmdb_id: int, admin = Depends(get_current_admin)):
 @app.post("/api/admin/contents/{tmdb_id}/refresh")
 async def refresh_content(tmdb_id: int, admin = Depends(get_current_admin)):
     """Refresh content data from TMDB and re-check vixsrc availability"""
+    ensure_catalog_writable()
     existing = contents.find_one({"tmdbId": tmdb_id})
     if not existing:
         raise HTTPException(status_code=404, detail="Content not found")
@@ -719,6 +1412,7 @@ async def refresh_content(tmdb_id: int, admin = Depends(get_current_admin)):
     if existing["type"] == "tv":
         await import_tv_seasons_episodes(tmdb_id)
     
+    stats_cache.clear()
     log_admin_action("REFRESH_CONTENT", str(tmdb_id))
     
     return {"success": True, "vixsrc_available": content.get("vixsrc_available", False)}
@@ -726,6 +1420,7 @@ async def refresh_content(tmdb_id: int, admin = Depends(get_current_admin)):
 @app.post("/api/admin/contents/{tmdb_id}/check-vixsrc")
 async def check_content_vixsrc(tmdb_id: int, admin = Depends(get_current_admin)):
     """Check vixsrc availability for a specific content"""
+    ensure_catalog_writable()
     existing = contents.find_one({"tmdbId": tmdb_id})
     if not existing:
         raise HTTPException(status_code=404, detail="Content not found")
@@ -744,6 +1439,7 @@ async def check_content_vixsrc(tmdb_id: int, admin = Depends(get_current_admin))
         }}
     )
     
+    stats_cache.clear()
     return {"success": True, "vixsrc_available": vixsrc_status["available"], "vixsrc_url": vixsrc_status.get("source_url")}
 
 @app.post("/api/admin/import-from-tmdb")
@@ -758,6 +1454,7 @@ async def import_trending_from_tmdb(
     Import trending/popular content from TMDB and verify availability on vixsrc.to
     Categories: popular, top_rated, trending, now_playing (movies), on_the_air (tv)
     """
+    ensure_catalog_writable()
     # Fetch from TMDB based on category
     if category == "trending":
         endpoint = f"/trending/{content_type}/week"
@@ -813,6 +1510,7 @@ async def import_trending_from_tmdb(
             except Exception as e:
                 logger.error(f"Error importing {tmdb_id}: {e}")
     
+    stats_cache.clear()
     log_admin_action("IMPORT_FROM_TMDB", metadata={
         "category": category,
         "content_type": content_type,
@@ -828,54 +1526,273 @@ async def import_trending_from_tmdb(
         "results": results
     }
 
-@app.post("/api/admin/verify-all-vixsrc")
-async def verify_all_vixsrc_availability(admin = Depends(get_current_admin)):
-    """Re-verify vixsrc availability for all contents in database"""
-    all_contents = list(contents.find({}, {"tmdbId": 1, "type": 1, "_id": 0}))
-    
-    verified = 0
-    available = 0
-    unavailable = 0
+# Bulk vixsrc verification: titles are read in keyset batches on tmdbId, probed with
+# bounded concurrency on one shared HTTP client and written back with bulk_write
+VIXSRC_VERIFY_CONCURRENCY = int(os.environ.get("VIXSRC_VERIFY_CONCURRENCY", "16"))
+VIXSRC_VERIFY_BATCH_SIZE = int(os.environ.get("VIXSRC_VERIFY_BATCH_SIZE", "200"))
+
+# Progress of the running (or last finished) verify-all job
+vixsrc_verify_job = {
+    "running": False,
+    "total": 0,
+    "verified": 0,
+    "available": 0,
+    "unavailable": 0,
+    "startedAt": None,
+    "finishedAt": None
+}
+vixsrc_verify_task = None
+
+async def run_vixsrc_verification() -> dict:
+    """Re-verify vixsrc availability for every content, updating vixsrc_verify_job as it goes"""
+    job = vixsrc_verify_job
+    job.update({
+        "running": True,
+        "total": contents.estimated_document_count(),
+        "verified": 0,
+        "available": 0,
+        "unavailable": 0,
+        "startedAt": datetime.now(timezone.utc).isoformat(),
+        "finishedAt": None
+    })
     
-    for item in all_contents:
-        vixsrc_status = await check_vixsrc_availability(item["tmdbId"], item["type"])
-        
-        contents.update_one(
-            {"tmdbId": item["tmdbId"]},
-            {"$set": {
-                "available": vixsrc_status["available"],
-                "vixsrc_available": vixsrc_status["available"],
-                "vixsrc_url": vixsrc_status.get("source_url"),
-                "vixsrc_checked_at": vixsrc_status.get("checked_at"),
-                "updatedAt": datetime.now(timezone.utc).isoformat()
-            }}
-        )
-        
-        verified += 1
-        if vixsrc_status["available"]:
-            available += 1
-        else:
-            unavailable += 1
+    semaphore = asyncio.Semaphore(VIXSRC_VERIFY_CONCURRENCY)
+    limits = httpx.Limits(
+        max_connections=VIXSRC_VERIFY_CONCURRENCY,
+        max_keepalive_connections=VIXSRC_VERIFY_CONCURRENCY
+    )
     
+    try:
+        async with httpx.AsyncClient(timeout=10.0, follow_redirects=True, limits=limits) as http_client:
+            async def verify_one(item: dict) -> dict:
+                async with semaphore:
+                    return await check_vixsrc_availability(item["tmdbId"], item["type"], http_client=http_client)
+            
+            last_id = None
+            while True:
+                query = {"tmdbId": {"$gt": last_id}} if last_id is not None else {}
+                batch = list(
+                    contents.find(query, {"tmdbId": 1, "type": 1, "_id": 0})
+                    .sort("tmdbId", ASCENDING)
+                    .limit(VIXSRC_VERIFY_BATCH_SIZE)
+                )
+                if not batch:
+                    break
+                last_id = batch[-1]["tmdbId"]
+                
+                statuses = await asyncio.gather(*(verify_one(item) for item in batch))
+                
+                now = datetime.now(timezone.utc).isoformat()
+                operations = []
+                for item, vixsrc_status in zip(batch, statuses):
+                    operations.append(UpdateOne(
+                        {"tmdbId": item["tmdbId"]},
+                        {"$set": {
+                            "available": vixsrc_status["available"],
+                            "vixsrc_available": vixsrc_status["available"],
+                            "vixsrc_url": vixsrc_status.get("source_url"),
+                            "vixsrc_checked_at": vixsrc_status.get("checked_at"),
+                            "updatedAt": now
+                        }}
+                    ))
+                    if vixsrc_status["available"]:
+                        job["available"] += 1
+                    else:
+                        job["unavailable"] += 1
+                contents.bulk_write(operations, ordered=False)
+                job["verified"] += len(batch)
+    finally:
+        job["running"] = False
+        job["finishedAt"] = datetime.now(timezone.utc).isoformat()
+    
+    stats_cache.clear()
     log_admin_action("VERIFY_ALL_VIXSRC", metadata={
-        "verified": verified,
-        "available": available,
-        "unavailable": unavailable
+        "verified": job["verified"],
+        "available": job["available"],
+        "unavailable": job["unavailable"]
     })
     
+    return dict(job)
+
+@app.post("/api/admin/verify-all-vixsrc")
+async def verify_all_vixsrc_availability(wait: bool = True, admin = Depends(get_current_admin)):
+    """
+    Re-verify vixsrc availability for all contents in database.
+    With wait=false the job runs in background; follow it via /progress or /stream.
+    """
+    global vixsrc_verify_task
+    if vixsrc_verify_job["running"]:
+        raise HTTPException(status_code=409, detail="Verification already running")
+    ensure_catalog_writable()
+    
+    if not wait:
+        # Mark as running right away so a second request cannot start a parallel job
+        vixsrc_verify_job["running"] = True
+        vixsrc_verify_task = asyncio.create_task(run_vixsrc_verification())
+        return {"success": True, "started": True}
+    
+    job = await run_vixsrc_verification()
     return {
         "success": True,
-        "verified": verified,
-        "available": available,
-        "unavailable": unavailable
+        "verified": job["verified"],
+        "available": job["available"],
+        "unavailable": job["unavailable"]
     }
 
-@app.post("/api/admin/cleanup")
-async def cleanup_database(admin = Depends(get_current_admin)):
-    """Clean up and reimport all content from database"""
+@app.get("/api/admin/verify-all-vixsrc/progress")
+def get_vixsrc_verification_progress(admin = Depends(get_current_admin)):
+    """Poll progress of the verify-all job"""
+    return vixsrc_verify_job
+
+@app.get("/api/admin/verify-all-vixsrc/stream")
+async def stream_vixsrc_verification_progress(admin = Depends(get_current_admin)):
+    """Stream verify-all progress as Server-Sent Events until the job finishes"""
+    async def event_stream():
+        while True:
+            yield f"data: {json.dumps(vixsrc_verify_job)}\n\n"
+            if not vixsrc_verify_job["running"]:
+                break
+            await asyncio.sleep(1)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Zero-downtime rebuild: the catalog is reimported into shadow collections, which are
+# then swapped in with renameCollection so public reads never see a partial catalog.
+# The three renames are not atomic together, so a marker document in
+# catalog_rebuild_state tracks the rebuild across processes: "building" (refreshed by a
+# heartbeat, and doubling as a lock so only one worker rebuilds) then "swapping".
+# At startup recover_catalog_swap() finishes a swap that was interrupted and drops the
+# shadows of a build whose heartbeat stopped.
+CATALOG_REBUILD_CONCURRENCY = int(os.environ.get("CATALOG_REBUILD_CONCURRENCY", "8"))
+CATALOG_REBUILD_LEASE_SECONDS = float(os.environ.get("CATALOG_REBUILD_LEASE_SECONDS", "300"))
+SHADOW_SUFFIX = "__shadow"
+CATALOG_SWAP_ORDER = ("tv_seasons", "tv_episodes", "contents")  # children first: every live title has its seasons
+CATALOG_REBUILD_MARKER = "shadow_rebuild"
+catalog_rebuild_state = db["catalog_rebuild_state"]
+
+def claim_catalog_rebuild() -> bool:
+    """Take the rebuild marker; False while another process is building or swapping"""
+    now = datetime.now(timezone.utc)
+    try:
+        catalog_rebuild_state.insert_one(
+            {"_id": CATALOG_REBUILD_MARKER, "state": "building", "startedAt": now.isoformat(), "heartbeatAt": now}
+        )
+        return True
+    except DuplicateKeyError:
+        taken = catalog_rebuild_state.find_one_and_update(
+            {
+                "_id": CATALOG_REBUILD_MARKER,
+                "state": "building",
+                "heartbeatAt": {"$lt": now - timedelta(seconds=CATALOG_REBUILD_LEASE_SECONDS)}
+            },
+            {"$set": {"startedAt": now.isoformat(), "heartbeatAt": now}}
+        )
+        return taken is not None
+
+def finish_catalog_swap():
+    """Rename every shadow collection still present over its live one, then clear the marker"""
+    existing = set(db.list_collection_names())
+    for name in CATALOG_SWAP_ORDER:
+        if f"{name}{SHADOW_SUFFIX}" in existing:
+            try:
+                db[f"{name}{SHADOW_SUFFIX}"].rename(name, dropTarget=True)
+            except OperationFailure as e:
+                logger.warning(f"Could not swap in {name}{SHADOW_SUFFIX}: {e}")  # renamed by another worker
+    catalog_rebuild_state.delete_one({"_id": CATALOG_REBUILD_MARKER})
+
+def recover_catalog_swap():
+    """Finish an interrupted swap, or drop the shadows of an abandoned build"""
+    marker = catalog_rebuild_state.find_one({"_id": CATALOG_REBUILD_MARKER})
+    if marker and marker.get("state") == "swapping":
+        logger.warning(f"Finishing the catalog swap of the rebuild started at {marker.get('startedAt')}")
+        finish_catalog_swap()
+        return
+    stale = datetime.now(timezone.utc) - timedelta(seconds=CATALOG_REBUILD_LEASE_SECONDS)
+    if marker and catalog_rebuild_state.find_one({"_id": CATALOG_REBUILD_MARKER, "heartbeatAt": {"$gte": stale}}):
+        return  # another worker is rebuilding right now
+    leftovers = [name for name in db.list_collection_names() if name.endswith(SHADOW_SUFFIX)]
+    if leftovers:
+        logger.warning(f"Dropping shadow collections of an interrupted catalog rebuild: {leftovers}")
+    for name in leftovers:
+        db[name].drop()
+    if marker:
+        catalog_rebuild_state.delete_one({"_id": CATALOG_REBUILD_MARKER, "state": "building"})
+
+recover_catalog_swap()
+
+async def rebuild_catalog_shadow(existing_ids: List[dict]) -> int:
+    """Reimport existing_ids into shadow collections and swap them in; returns reimported count"""
+    if not await asyncio.to_thread(claim_catalog_rebuild):
+        raise HTTPException(status_code=409, detail="Catalog rebuild running in another worker")
+    shadow_contents = db[f"contents{SHADOW_SUFFIX}"]
+    shadow_seasons = db[f"tv_seasons{SHADOW_SUFFIX}"]
+    shadow_episodes = db[f"tv_episodes{SHADOW_SUFFIX}"]
+    swapping = False
+    try:
+        # Leftovers from an interrupted rebuild
+        for collection in (shadow_contents, shadow_seasons, shadow_episodes):
+            collection.drop()
+        create_catalog_indexes(shadow_contents, shadow_seasons, shadow_episodes)
+        
+        semaphore = asyncio.Semaphore(CATALOG_REBUILD_CONCURRENCY)
+        
+        async def rebuild_one(item: dict) -> bool:
+            tmdb_id = item["tmdbId"]
+            async with semaphore:
+                catalog_rebuild_state.update_one(
+                    {"_id": CATALOG_REBUILD_MARKER}, {"$set": {"heartbeatAt": datetime.now(timezone.utc)}}
+                )
+                try:
+                    content = await import_content_from_tmdb(tmdb_id, item["type"])
+                    if content:
+                        content["available"] = True
+                        shadow_contents.insert_one(content)
+                        if item["type"] == "tv":
+                            await import_tv_seasons_episodes(tmdb_id, shadow_seasons, shadow_episodes)
+                        return True
+                except Exception as e:
+                    logger.error(f"Error reimporting {tmdb_id}: {e}")
+            
+            # Carry the current version over so a failed reimport never drops a title
+            previous = contents.find_one({"tmdbId": tmdb_id}, {"_id": 0})
+            if previous and not shadow_contents.find_one({"tmdbId": tmdb_id}, {"_id": 1}):
+                shadow_contents.insert_one(previous)
+                previous_seasons = list(tv_seasons.find({"tmdbId": tmdb_id}, {"_id": 0}))
+                if previous_seasons:
+                    shadow_seasons.insert_many(previous_seasons)
+                previous_episodes = list(tv_episodes.find({"tmdbId": tmdb_id}, {"_id": 0}))
+                if previous_episodes:
+                    shadow_episodes.insert_many(previous_episodes)
+            return False
+        
+        results = await asyncio.gather(*(rebuild_one(item) for item in existing_ids))
+        
+        catalog_rebuild_state.update_one({"_id": CATALOG_REBUILD_MARKER}, {"$set": {"state": "swapping"}})
+        swapping = True
+        finish_catalog_swap()
+    except BaseException:
+        if swapping:
+            finish_catalog_swap()  # never leave contents and its seasons from different builds
+        else:
+            catalog_rebuild_state.delete_one({"_id": CATALOG_REBUILD_MARKER})
+        raise
+    
+    return sum(1 for ok in results if ok)
+
+async def rebuild_catalog(mode: str) -> dict:
     # Get all existing content IDs
     existing_ids = list(contents.find({}, {"tmdbId": 1, "type": 1, "_id": 0}))
     
+    if mode == "shadow":
+        reimported = await rebuild_catalog_shadow(existing_ids) if existing_ids else 0
+        stats_cache.clear()
+        log_admin_action("CLEANUP_DATABASE", metadata={"reimported": reimported, "mode": mode})
+        return {"success": True, "reimported": reimported, "total": len(existing_ids), "mode": mode}
+    
     # Clear all data
     contents.delete_many({})
     tv_seasons.delete_many({})
@@ -897,9 +1814,10 @@ async def cleanup_database(admin = Depends(get_current_admin)):
         except Exception as e:
             logger.error(f"Error reimporting {item['tmdbId']}: {e}")
     
-    log_admin_action("CLEANUP_DATABASE", metadata={"reimported": reimported})
+    stats_cache.clear()
+    log_admin_action("CLEANUP_DATABASE", metadata={"reimported": reimported, "mode": mode})
     
-    return {"success": True, "reimported": reimported, "total": len(existing_ids)}
+    return {"success": True, "reimported": reimported, "total": len(existing_ids), "mode": mode}
 
 # =====================
 # HERO MANAGEMENT ENDPOINTS
@@ -934,6 +1852,7 @@ def update_hero(data: HeroUpdate, admin = Depends(get_current_admin)):
     }
     
     hero_settings.update_one({}, {"$set": hero_data}, upsert=True)
+    stats_cache.clear()
     log_admin_action("UPDATE_HERO", data.contentId, {"mediaType": data.mediaType})
     
     return {"success": True, "hero": hero_data}
@@ -1158,27 +2077,34 @@ class UserUpdate(BaseModel):
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verify JWT token and return user"""
+    return resolve_user_token(credentials.credentials)
+
+def resolve_user_token(token: str) -> dict:
+    """Decode a user JWT and return the (cached) user document"""
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id = payload.get("user_id")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
-        user = users.find_one({"id": user_id}, {"_id": 0, "password": 0})
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        return user
+        user = principal_cache.get(("user", user_id))
+        if user is None:
+            user = users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+            if not user:
+                raise HTTPException(status_code=401, detail="User not found")
+            principal_cache.set(("user", user_id), user)
+        return dict(user)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 @app.post("/api/auth/register")
-def register_user(data: UserRegister):
+async def register_user(data: UserRegister, request: Request):
     """Register new user"""
+    attempt = await asyncio.to_thread(enforce_auth_rate_limits, request, data.email)
     import uuid
     
-    existing = users.find_one({"email": data.email.lower()})
+    existing = await asyncio.to_thread(users.find_one, {"email": data.email.lower()})
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -1189,18 +2115,19 @@ def register_user(data: UserRegister):
         raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
     
     now = datetime.now(timezone.utc).isoformat()
-    hashed = bcrypt.hashpw(data.password.encode(), bcrypt.gensalt())
+    hashed = await hash_password(data.password)
     
     user = {
         "id": str(uuid.uuid4()),
         "email": data.email.lower(),
-        "password": hashed.decode(),
+        "password": hashed,
         "name": sanitize_string(data.name) or data.email.split("@")[0],
         "profileImage": None,
         "createdAt": now,
         "updatedAt": now
     }
-    users.insert_one(user)
+    await asyncio.to_thread(users.insert_one, user)
+    await asyncio.to_thread(release_auth_attempt, attempt)
     
     payload = {
         "user_id": user["id"],
@@ -1221,14 +2148,26 @@ def register_user(data: UserRegister):
     }
 
 @app.post("/api/auth/login")
-def login_user(data: UserLogin):
+async def login_user(data: UserLogin, request: Request):
     """Login user"""
-    user = users.find_one({"email": data.email.lower()})
+    attempt = await asyncio.to_thread(enforce_auth_rate_limits, request, data.email)
+    user = await asyncio.to_thread(users.find_one, {"email": data.email.lower()})
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not bcrypt.checkpw(data.password.encode(), user["password"].encode()):
+    if not await verify_password(data.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    await asyncio.to_thread(release_auth_attempt, attempt)
+    
+    if password_needs_rehash(user["password"]):
+        try:
+            await asyncio.to_thread(
+                users.update_one,
+                {"id": user["id"]},
+                {"$set": {"password": await hash_password(data.password)}}
+            )
+        except HTTPException:
+            pass  # Pool busy - upgrade on a later login
     
     payload = {
         "user_id": user["id"],
@@ -1254,7 +2193,7 @@ def get_user_profile(user = Depends(get_current_user)):
     return user
 
 @app.put("/api/auth/profile")
-def update_user_profile(data: UserUpdate, user = Depends(get_current_user)):
+async def update_user_profile(data: UserUpdate, user = Depends(get_current_user)):
     """Update user profile"""
     update_data = {"updatedAt": datetime.now(timezone.utc).isoformat()}
     
@@ -1262,7 +2201,7 @@ def update_user_profile(data: UserUpdate, user = Depends(get_current_user)):
         update_data["name"] = sanitize_string(data.name)
     
     if data.email is not None:
-        existing = users.find_one({"email": data.email.lower(), "id": {"$ne": user["id"]}})
+        existing = await asyncio.to_thread(users.find_one, {"email": data.email.lower(), "id": {"$ne": user["id"]}})
         if existing:
             raise HTTPException(status_code=400, detail="Email already in use")
         if not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', data.email):
@@ -1272,20 +2211,20 @@ def update_user_profile(data: UserUpdate, user = Depends(get_current_user)):
     if data.password is not None:
         if len(data.password) < 6:
             raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
-        hashed = bcrypt.hashpw(data.password.encode(), bcrypt.gensalt())
-        update_data["password"] = hashed.decode()
+        update_data["password"] = await hash_password(data.password)
     
     if data.profileImage is not None:
         update_data["profileImage"] = data.profileImage
     
-    users.update_one({"id": user["id"]}, {"$set": update_data})
-    updated = users.find_one({"id": user["id"]}, {"_id": 0, "password": 0})
+    await asyncio.to_thread(users.update_one, {"id": user["id"]}, {"$set": update_data})
+    principal_cache.pop(("user", user["id"]))
+    updated = await asyncio.to_thread(users.find_one, {"id": user["id"]}, {"_id": 0, "password": 0})
     return updated
 
 @app.get("/api/auth/history")
 def get_user_history(user = Depends(get_current_user)):
     """Get user watch history"""
-    history = list(user_lists.find({"user_id": user["id"]}, {"_id": 0}).sort("added_at", -1).limit(50))
+    history = list_items_for_user(user["id"], limit=50)
     return {"items": history}
 
 
@@ -1294,7 +2233,13 @@ def delete_user_account(user = Depends(get_current_user)):
     """Delete user account and all associated data"""
     user_id = user["id"]
     users.delete_one({"id": user_id})
+    principal_cache.pop(("user", user_id))
+    watch_progress_buffer.discard_user(user_id)
+    user_title_state.delete_many({"user_id": user_id})
+    # Legacy per-flag collections, kept only as the migration source
     user_lists.delete_many({"user_id": user_id})
+    user_likes.delete_many({"user_id": user_id})
+    user_ratings.delete_many({"user_id": user_id})
     watch_progress.delete_many({"user_id": user_id})
     return {"status": "deleted"}
 
@@ -1305,8 +2250,8 @@ def delete_user_account(user = Depends(get_current_user)):
 class WatchProgressUpdate(BaseModel):
     tmdb_id: int
     media_type: str  # "movie" or "tv"
-    progress: float  # seconds watched
-    duration: float  # total duration in seconds
+    progress: float = Field(allow_inf_nan=False)  # seconds watched
+    duration: float = Field(allow_inf_nan=False)  # total duration in seconds
     title: Optional[str] = None
     backdrop_path: Optional[str] = None
     poster_path: Optional[str] = None
@@ -1316,59 +2261,32 @@ class WatchProgressUpdate(BaseModel):
 @app.post("/api/auth/watch-progress")
 def save_watch_progress(data: WatchProgressUpdate, user = Depends(get_current_user)):
     """Save or update watch progress for a content item"""
-    now = datetime.now(timezone.utc).isoformat()
-    user_id = user["id"]
+    return record_watch_progress(user["id"], data)
 
+def record_watch_progress(user_id: str, data: WatchProgressUpdate) -> dict:
+    """Apply a progress update - shared by the HTTP endpoint and the playback channel"""
     # If progress >= 95% of duration, mark as completed and remove
     if data.duration > 0 and (data.progress / data.duration) >= 0.95:
-        watch_progress.delete_one({"user_id": user_id, "tmdb_id": data.tmdb_id})
+        watch_progress_buffer.clear(user_id, data.tmdb_id)
         return {"status": "completed", "message": "Content marked as completed and removed from continue watching"}
 
     # Only save if progress > 30 seconds (avoid accidental saves)
     if data.progress < 30:
         return {"status": "skipped", "message": "Progress too short to save"}
 
-    doc = {
-        "user_id": user_id,
-        "tmdb_id": data.tmdb_id,
-        "media_type": data.media_type,
-        "progress": data.progress,
-        "duration": data.duration,
-        "title": data.title or "",
-        "backdrop_path": data.backdrop_path or "",
-        "poster_path": data.poster_path or "",
-        "updated_at": now,
-    }
-    if data.season is not None:
-        doc["season"] = data.season
-    if data.episode is not None:
-        doc["episode"] = data.episode
-
-    watch_progress.update_one(
-        {"user_id": user_id, "tmdb_id": data.tmdb_id},
-        {"$set": doc, "$setOnInsert": {"created_at": now}},
-        upsert=True
-    )
+    watch_progress_buffer.save(user_id, build_progress_doc(data))
     return {"status": "saved", "progress": data.progress, "duration": data.duration}
 
 @app.get("/api/auth/watch-progress")
 def get_all_watch_progress(user = Depends(get_current_user)):
     """Get all watch progress items for the current user (continue watching list)"""
-    items = list(
-        watch_progress.find(
-            {"user_id": user["id"]},
-            {"_id": 0, "user_id": 0}
-        ).sort("updated_at", DESCENDING).limit(20)
-    )
+    items = list_watch_progress(user["id"])
     return {"items": items, "username": user.get("name", "Utente")}
 
 @app.get("/api/auth/watch-progress/{tmdb_id}")
 def get_watch_progress(tmdb_id: int, user = Depends(get_current_user)):
     """Get watch progress for a specific content"""
-    item = watch_progress.find_one(
-        {"user_id": user["id"], "tmdb_id": tmdb_id},
-        {"_id": 0, "user_id": 0}
-    )
+    item = find_watch_progress(user["id"], tmdb_id)
     if not item:
         return {"progress": 0, "duration": 0}
     return item
@@ -1376,35 +2294,201 @@ def get_watch_progress(tmdb_id: int, user = Depends(get_current_user)):
 @app.delete("/api/auth/watch-progress/{tmdb_id}")
 def delete_watch_progress(tmdb_id: int, user = Depends(get_current_user)):
     """Remove a content from continue watching"""
-    watch_progress.delete_one({"user_id": user["id"], "tmdb_id": tmdb_id})
+    watch_progress_buffer.clear(user["id"], tmdb_id)
     return {"status": "deleted"}
 
+# =====================
+# PLAYBACK CHANNEL (WebSocket)
+# =====================
+
+# The player keeps one authenticated socket open and streams JSON events over it:
+#   {"type": "auth", "token"}  - first message, within PLAYBACK_AUTH_TIMEOUT_SECONDS
+#   {"type": "progress", "tmdb_id", "media_type", "progress", "duration", ...}
+#   {"type": "view", "tmdb_id", "media_type"}
+# The token travels in a message rather than the URL so it never reaches access logs;
+# a bad or missing token closes the socket with 4401 after the handshake.
+# The user is resolved once per connection. Events carrying a "seq" are acknowledged.
+# title/poster_path/backdrop_path only need to be sent with the first progress event.
+
+PROGRESS_METADATA_FIELDS = ("title", "backdrop_path", "poster_path")
+PLAYBACK_AUTH_TIMEOUT_SECONDS = float(os.environ.get("PLAYBACK_AUTH_TIMEOUT_SECONDS", "10"))
+
+# TMDB ids are stored as BSON int64: anything outside this range can never be written
+MAX_TMDB_ID = 2**63 - 1
+
+def parse_playback_title(message: dict) -> tuple:
+    media_type = message.get("media_type")
+    if media_type not in ("movie", "tv"):
+        raise ValueError("media_type must be 'movie' or 'tv'")
+    tmdb_id = message["tmdb_id"]
+    if type(tmdb_id) is not int:  # no floats, bools or numeric strings
+        raise TypeError("tmdb_id must be an integer")
+    if not 0 < tmdb_id <= MAX_TMDB_ID:
+        raise ValueError("tmdb_id out of range")
+    return tmdb_id, media_type
+
+def finite_float(value, field: str) -> float:
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{field} must be a finite number")
+    return number
+
+def parse_progress_event(message: dict, metadata: dict) -> WatchProgressUpdate:
+    """Validate a progress event without a full model validation pass"""
+    tmdb_id, media_type = parse_playback_title(message)
+    known = metadata.setdefault(tmdb_id, {})
+    for field in PROGRESS_METADATA_FIELDS:
+        if message.get(field):
+            known[field] = str(message[field])
+    season = message.get("season")
+    episode = message.get("episode")
+    return WatchProgressUpdate.model_construct(
+        tmdb_id=tmdb_id,
+        media_type=media_type,
+        progress=finite_float(message["progress"], "progress"),
+        duration=finite_float(message["duration"], "duration"),
+        season=int(season) if season is not None else None,
+        episode=int(episode) if episode is not None else None,
+        **{field: known.get(field) for field in PROGRESS_METADATA_FIELDS}
+    )
+
+async def authenticate_playback_channel(websocket: WebSocket) -> Optional[dict]:
+    """Resolve the user from the first message; closes the socket with 4401 and returns None on failure"""
+    try:
+        raw = await asyncio.wait_for(websocket.receive_text(), PLAYBACK_AUTH_TIMEOUT_SECONDS)
+        message = json.loads(raw)
+        if not isinstance(message, dict) or message.get("type") != "auth" or not isinstance(message.get("token"), str):
+            raise ValueError("first message must be {\"type\": \"auth\", \"token\": ...}")
+        user = await asyncio.to_thread(resolve_user_token, message["token"])
+    except WebSocketDisconnect:
+        return None
+    except asyncio.TimeoutError:
+        await websocket.close(code=4401, reason="Authentication timed out")
+        return None
+    except ValueError as e:
+        await websocket.close(code=4401, reason=str(e))
+        return None
+    except HTTPException as e:
+        await websocket.close(code=4401, reason=e.detail)
+        return None
+    await websocket.send_json({"type": "auth", "status": "ok"})
+    return user
+
+@app.websocket("/api/ws/playback")
+async def playback_channel(websocket: WebSocket):
+    """Authenticated player channel for progress heartbeats and view events"""
+    # Accept before authenticating: a close before accept() reaches the client as an
+    # HTTP 403 and the 4401 code is lost
+    await websocket.accept()
+    user = await authenticate_playback_channel(websocket)
+    if user is None:
+        return
+    user_id = user["id"]
+    metadata = {}
+    started = set()
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            seq = None
+            try:
+                message = json.loads(raw)
+                if not isinstance(message, dict):
+                    raise ValueError("event must be an object")
+                seq = message.get("seq")
+                event_type = message.get("type")
+                if event_type == "progress":
+                    update = parse_progress_event(message, metadata)
+                    result = record_watch_progress(user_id, update)
+                    status = result["status"]
+                    playing = (update.tmdb_id, update.season, update.episode)
+                    if update.media_type == "tv" and playing not in started:
+                        started.add(playing)  # first heartbeat of an episode acts as playback start
+                        await schedule_next_episode(*playing)
+                elif event_type == "view":
+                    view_ingestor.add(*parse_playback_title(message), viewer=f"user:{user_id}")
+                    status = "recorded"
+                else:
+                    raise ValueError("unknown event type")
+            except (KeyError, OverflowError, TypeError, ValueError) as e:
+                await websocket.send_json({"type": "error", "seq": seq, "detail": str(e)})
+                continue
+            except PyMongoError as e:
+                # A database hiccup fails this event, not the connection
+                logger.warning(f"Playback event for user {user_id} failed: {e}")
+                await websocket.send_json({"type": "error", "seq": seq, "status": "unavailable", "detail": "Temporarily unavailable, retry"})
+                continue
+            if seq is not None:
+                await websocket.send_json({"type": "ack", "seq": seq, "status": status})
+    except WebSocketDisconnect:
+        pass
+
+# Dashboard stats are computed in one aggregation pass and cached for a short TTL;
+# content writes clear the cache so admins see their own changes immediately
+STATS_CACHE_TTL_SECONDS = float(os.environ.get("STATS_CACHE_TTL_SECONDS", "30"))
+stats_cache = TTLCache(STATS_CACHE_TTL_SECONDS, max_size=1)
+
+def compute_content_stats() -> dict:
+    """Count contents by type/availability in a single aggregation pass"""
+    pipeline = [
+        {"$project": {"_id": 0, "type": 1, "available": 1, "vixsrc_available": 1}},
+        {"$group": {
+            "_id": None,
+            "total": {"$sum": 1},
+            "movies": {"$sum": {"$cond": [{"$eq": ["$type", "movie"]}, 1, 0]}},
+            "tvShows": {"$sum": {"$cond": [{"$eq": ["$type", "tv"]}, 1, 0]}},
+            "visible": {"$sum": {"$cond": [{"$eq": ["$available", True]}, 1, 0]}},
+            "hidden": {"$sum": {"$cond": [{"$eq": ["$available", False]}, 1, 0]}},
+            "vixsrc_available": {"$sum": {"$cond": [{"$eq": ["$vixsrc_available", True]}, 1, 0]}}
+        }}
+    ]
+    counts = next(contents.aggregate(pipeline), None) or {}
+    counts.pop("_id", None)
+    return {
+        "total": counts.get("total", 0),
+        "movies": counts.get("movies", 0),
+        "tvShows": counts.get("tvShows", 0),
+        "visible": counts.get("visible", 0),
+        "hidden": counts.get("hidden", 0),
+        "vixsrc_available": counts.get("vixsrc_available", 0)
+    }
+
 @app.get("/api/admin/stats")
 def get_stats(admin = Depends(get_current_admin)):
     """Get dashboard statistics"""
-    total = contents.count_documents({})
-    movies = contents.count_documents({"type": "movie"})
-    tv = contents.count_documents({"type": "tv"})
-    visible = contents.count_documents({"available": True})
-    hidden = contents.count_documents({"available": False})
-    vixsrc_available = contents.count_documents({"vixsrc_available": True})
-    total_seasons = tv_seasons.count_documents({})
-    total_episodes = tv_episodes.count_documents({})
-    
-    last_added = contents.find_one({}, {"_id": 0}, sort=[("createdAt", -1)])
-    hero = hero_settings.find_one({}, {"_id": 0})
-    
+    cached = stats_cache.get("stats")
+    if cached is not None:
+        return cached
+    
+    stats = compute_content_stats()
+    # Season/episode totals of the managed catalog only: tv_seasons/tv_episodes also
+    # cache shows that were merely browsed
+    managed_tv = {"tmdbId": {"$in": contents.distinct("tmdbId", {"type": "tv"})}, "season_number": {"$gt": 0}}
+    stats["totalSeasons"] = tv_seasons.count_documents(managed_tv)
+    stats["totalEpisodes"] = tv_episodes.count_documents(managed_tv)
+    stats["lastAdded"] = contents.find_one({}, {"_id": 0}, sort=[("createdAt", -1)])
+    stats["currentHero"] = hero_settings.find_one({}, {"_id": 0})
+    
+    stats_cache.set("stats", stats)
+    return stats
+
+@app.get("/api/admin/metrics")
+def get_metrics(admin = Depends(get_current_admin)):
+    """In-process cache and performance counters"""
+    principal_stats = principal_cache.stats()
+    # Every hit is a users/admin_users find_one that did not happen
+    principal_stats["dbReadsSaved"] = principal_stats["hits"]
     return {
-        "total": total,
-        "movies": movies,
-        "tvShows": tv,
-        "visible": visible,
-        "hidden": hidden,
-        "vixsrc_available": vixsrc_available,
-        "totalSeasons": total_seasons,
-        "totalEpisodes": total_episodes,
-        "lastAdded": last_added,
-        "currentHero": hero
+        "principalCache": principal_stats,
+        "statsCache": stats_cache.stats(),
+        "tmdbDetailsCache": tmdb_details_cache.stats(),
+        "searchIndex": catalog_search_index.stats(),
+        "suggest": title_suggester.stats(),
+        "tvPrefetch": tv_prefetcher.stats(),
+        "passwordHashing": get_password_hash_stats(),
+        "authAdmission": dict(admission_stats, maxInflightHashes=PASSWORD_HASH_MAX_INFLIGHT),
+        "watchProgressBuffer": watch_progress_buffer.stats(),
+        "viewIngestion": view_ingestor.stats(),
+        "adminAudit": admin_audit.stats()
     }
 
 # =====================
@@ -1415,25 +2499,56 @@ def get_stats(admin = Depends(get_current_admin)):
 def get_admin_logs(
     action: Optional[str] = None,
     page: int = 1,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     admin = Depends(get_current_admin)
 ):
-    """Get admin activity logs"""
+    """
+    Get admin activity logs, newest first.
+    Pass back nextCursor as cursor to page without skip/count; page is kept for older clients.
+    """
+    # Make entries still sitting in the buffer visible to the viewer
+    admin_audit.flush()
+    
     query = {}
     if action:
         query["action"] = action
+    sort_spec = [("timestamp", DESCENDING), ("_id", DESCENDING)]
     
-    total = admin_logs.count_documents(query)
-    skip = (page - 1) * limit
-    
-    items = list(admin_logs.find(query, {"_id": 0}).sort("timestamp", -1).skip(skip).limit(limit))
+    if cursor:
+        position = decode_cursor(cursor)
+        try:
+            last_time = datetime.fromisoformat(position["t"])
+            last_id = ObjectId(position["id"])
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query["$or"] = [
+            {"timestamp": {"$lt": last_time}},
+            {"timestamp": last_time, "_id": {"$lt": last_id}}
+        ]
+        items = list(admin_logs.find(query).sort(sort_spec).limit(limit))
+        total = None
+    else:
+        total = admin_logs.count_documents(query) if query else admin_logs.estimated_document_count()
+        skip = (page - 1) * limit
+        items = list(admin_logs.find(query).sort(sort_spec).skip(skip).limit(limit))
+    
+    next_cursor = None
+    if len(items) == limit and isinstance(items[-1].get("timestamp"), datetime):
+        last = items[-1]
+        next_cursor = encode_cursor({"t": last["timestamp"].isoformat(), "id": str(last["_id"])})
+    for item in items:
+        item.pop("_id", None)
     
-    return {
+    response = {
         "items": items,
         "total": total,
-        "page": page,
-        "totalPages": (total + limit - 1) // limit
+        "nextCursor": next_cursor
     }
+    if total is not None:
+        response["page"] = page
+        response["totalPages"] = (total + limit - 1) // limit
+    return response
 
 # =====================
 # PUBLIC API ENDPOINTS (for frontend)
@@ -1472,6 +2587,7 @@ async def check_vixsrc_with_cache(tmdb_id: int, content_type: str, cache_hours:
         }},
         upsert=True
     )
+    catalog_search_index.set_availability(tmdb_id, content_type, result["available"])
     
     return result["available"]
 
@@ -2090,105 +3206,382 @@ async def get_sections_with_content():
 # VIEW TRACKING & TOP 10 ENDPOINTS
 # =====================
 
-class ViewRecord(BaseModel):
-    tmdb_id: int
-    media_type: str  # "movie" or "tv"
+VIEW_RETENTION_DAYS = int(os.environ.get("VIEW_RETENTION_DAYS", "90"))  # 0 = keep forever
+
+# Views are bucketed by UTC calendar day in every store, and a window of N days is
+# today plus the N - 1 days before it, whichever store answers
+def view_day_start(day: str) -> datetime:
+    """Midnight UTC of a "%Y-%m-%d" view day"""
+    return datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+def view_window_start(window_days: int) -> datetime:
+    """Midnight UTC of the first day of a window_days window ending today"""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=window_days - 1)
+
+# Unique viewers are estimated with one HyperLogLog sketch per (type, tmdbId, day):
+# 2^12 one-byte registers (4KB, ~1.6% standard error), mergeable across days by
+# taking the register-wise max. Each sketch carries its day as a BSON date (dayStart)
+# so a TTL index drops it after VIEW_RETENTION_DAYS, like the views themselves.
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_VALUE_BITS = 64 - HLL_PRECISION
+content_view_sketches = db["content_view_sketches"]
+
+def ensure_view_sketch_indexes():
+    """Unique (date, type, tmdbId) key plus the retention TTL; backfills dayStart on older sketches"""
+    content_view_sketches.create_index(
+        [("date", ASCENDING), ("type", ASCENDING), ("tmdbId", ASCENDING)], unique=True
+    )
+    try:
+        content_view_sketches.update_many(
+            {"dayStart": {"$exists": False}},
+            [{"$set": {"dayStart": {"$dateFromString": {"dateString": "$date"}}}}]
+        )
+    except Exception as e:
+        logger.warning(f"Could not backfill view sketch dates: {e}")
+    
+    ttl_options = {}
+    if VIEW_RETENTION_DAYS > 0:
+        ttl_options["expireAfterSeconds"] = VIEW_RETENTION_DAYS * 86400
+    try:
+        content_view_sketches.create_index("dayStart", **ttl_options)
+    except OperationFailure:
+        # Retention changed since the index was built
+        content_view_sketches.drop_index("dayStart_1")
+        content_view_sketches.create_index("dayStart", **ttl_options)
+
+ensure_view_sketch_indexes()
+
+def viewer_hash(viewer: str) -> int:
+    return int.from_bytes(hashlib.blake2b(viewer.encode("utf-8"), digest_size=8).digest(), "big")
+
+def hll_add(registers: bytearray, hashed: int):
+    index = hashed >> HLL_VALUE_BITS
+    rank = HLL_VALUE_BITS - (hashed & ((1 << HLL_VALUE_BITS) - 1)).bit_length() + 1
+    if rank > registers[index]:
+        registers[index] = rank
+
+def hll_merge(target: bytearray, other: bytes):
+    for index, rank in enumerate(other):
+        if rank > target[index]:
+            target[index] = rank
+
+def hll_estimate(registers: bytes) -> int:
+    alpha = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+    estimate = alpha * HLL_REGISTERS * HLL_REGISTERS / sum(2.0 ** -rank for rank in registers)
+    zeros = registers.count(0)
+    if estimate <= 2.5 * HLL_REGISTERS and zeros:
+        estimate = HLL_REGISTERS * math.log(HLL_REGISTERS / zeros)  # linear counting for small sets
+    return int(round(estimate))
+
+def merge_view_sketch(media_type: str, tmdb_id: int, day: str, hashes: set, attempts: int = 3) -> bool:
+    """Fold viewer hashes into the stored sketch with an optimistic version check"""
+    key = {"type": media_type, "tmdbId": tmdb_id, "date": day}
+    for _ in range(attempts):
+        existing = content_view_sketches.find_one(key, {"registers": 1, "version": 1})
+        registers = bytearray(existing["registers"]) if existing else bytearray(HLL_REGISTERS)
+        for hashed in hashes:
+            hll_add(registers, hashed)
+        try:
+            if existing:
+                result = content_view_sketches.update_one(
+                    {"_id": existing["_id"], "version": existing.get("version", 0)},
+                    {"$set": {"registers": Binary(bytes(registers))}, "$inc": {"version": 1}}
+                )
+                if result.matched_count:
+                    return True
+            else:
+                content_view_sketches.insert_one(
+                    {**key, "dayStart": view_day_start(day), "registers": Binary(bytes(registers)), "version": 1}
+                )
+                return True
+        except DuplicateKeyError:
+            pass  # created concurrently, merge into it on the next attempt
+    return False
 
-@app.post("/api/public/record-view")
-async def record_view(data: ViewRecord):
-    """
-    Record a view for a piece of content.
-    Upserts the view count in the content_views collection.
-    """
-    if data.media_type not in ("movie", "tv"):
-        raise HTTPException(status_code=400, detail="media_type must be 'movie' or 'tv'")
+# Unique viewers are counted by a first-party anonymous id when the client sends one
+# (viewer_id: random, generated once and kept in localStorage), else by client IP plus
+# user agent. That fallback needs the real client IP: behind a reverse proxy without
+# TRUST_PROXY_HEADERS=true every viewer shares the proxy's address, and unique viewers
+# collapse to the number of distinct user agents.
+VIEWER_ID_MAX_LENGTH = 64
+
+if not TRUST_PROXY_HEADERS:
+    logger.warning(
+        "TRUST_PROXY_HEADERS is off: clients that send no viewer_id are told apart by the "
+        "connecting IP, which behind a reverse proxy is the proxy's for everyone"
+    )
 
-    now = datetime.now(timezone.utc).isoformat()
-    content_views.update_one(
-        {"tmdbId": data.tmdb_id, "type": data.media_type},
-        {
-            "$inc": {"views": 1},
-            "$setOnInsert": {"tmdbId": data.tmdb_id, "type": data.media_type, "createdAt": now},
-            "$set": {"updatedAt": now}
-        },
-        upsert=True
-    )
-    return {"success": True}
+def viewer_fingerprint(request: Request, viewer_id: Optional[str] = None) -> str:
+    """Anonymous viewer identity for unique counting: the client's viewer_id, else IP plus user agent"""
+    if viewer_id is not None:
+        if not isinstance(viewer_id, str) or not 0 < len(viewer_id) <= VIEWER_ID_MAX_LENGTH:
+            raise HTTPException(status_code=400, detail=f"viewer_id must be 1-{VIEWER_ID_MAX_LENGTH} characters")
+        return f"id:{viewer_id}"
+    return f"{get_client_ip(request)}|{request.headers.get('user-agent', '')}"
+
+# Views are stored as measurements in a time-series collection (timeField ts, metaField
+# {type, tmdbId}) that Mongo buckets by title and expires after VIEW_RETENTION_DAYS;
+# window queries on ts only open the matching buckets. Deployments whose server
+# can't create time-series collections keep the per-day counters in content_views.
+VIEW_EVENTS_COLLECTION = "content_view_events"
+content_view_events = db[VIEW_EVENTS_COLLECTION]
+
+def ensure_view_timeseries() -> bool:
+    """Create (or retune) the time-series view store; False if the server can't host it"""
+    ttl_options = {}
+    if VIEW_RETENTION_DAYS > 0:
+        ttl_options["expireAfterSeconds"] = VIEW_RETENTION_DAYS * 86400
+    try:
+        if VIEW_EVENTS_COLLECTION not in db.list_collection_names():
+            db.create_collection(
+                VIEW_EVENTS_COLLECTION,
+                timeseries={"timeField": "ts", "metaField": "meta", "granularity": "hours"},
+                **ttl_options
+            )
+        else:
+            db.command("collMod", VIEW_EVENTS_COLLECTION, expireAfterSeconds=ttl_options.get("expireAfterSeconds", "off"))
+        content_view_events.create_index([("ts", ASCENDING)])
+        return True
+    except OperationFailure as e:
+        logger.warning(f"Time-series view store unavailable, using per-day counters: {e}")
+        return False
+
+VIEW_STORE = "timeseries" if ensure_view_timeseries() else "counters"
+
+# Every view source feeds one in-memory counter per (type, tmdbId, day); a periodic
+# job flushes it in one write: an insert_many of measurements into the time-series
+# store, or (counters fallback) a single bulk_write of $inc upserts into content_views.
+# In the counters store each (type, tmdbId, day) is split over VIEW_COUNTER_SHARDS documents and every
+# flush picks one at random, so workers don't all contend on a hot title's document;
+# readers sum the shards through the Top 10 rollup
+VIEW_FLUSH_INTERVAL_SECONDS = float(os.environ.get("VIEW_FLUSH_INTERVAL_SECONDS", "5"))
+VIEW_COUNTER_SHARDS = max(1, int(os.environ.get("VIEW_COUNTER_SHARDS", "8")))
+# Only connection-level failures are retried, and at most this many times; a counter
+# that fails for any other reason (e.g. it can't be encoded) is dropped and logged
+VIEW_FLUSH_MAX_RETRIES = int(os.environ.get("VIEW_FLUSH_MAX_RETRIES", "5"))
+VIEW_MEDIA_TYPES = ("movie", "tv")
+
+class ViewIngestor:
+    """Aggregated per-day view counts waiting to be written to content_views"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._pending = Counter()  # (media_type, tmdb_id, date) -> views
+        self._viewers = {}         # (media_type, tmdb_id, date) -> {viewer hash}
+        self._attempts = Counter()  # ("views" | "sketch", key) -> failed writes so far
+        self._lock = threading.Lock()
+        self.received = 0
+        self.written = 0
+        self.dropped = 0
+
+    def add(self, tmdb_id: int, media_type: str, count: int = 1, viewer: Optional[str] = None):
+        self.add_many(Counter({(tmdb_id, media_type): count}), viewer)
+
+    def add_many(self, counts: Counter, viewer: Optional[str] = None):
+        """Apply {(tmdb_id, media_type): views} under a single lock acquisition"""
+        day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        hashed = viewer_hash(viewer) if viewer else None
+        with self._lock:
+            for (tmdb_id, media_type), views in counts.items():
+                key = (media_type, tmdb_id, day)
+                self._pending[key] += views
+                if hashed is not None:
+                    self._viewers.setdefault(key, set()).add(hashed)
+            self.received += sum(counts.values())
+
+    def _should_retry(self, kind: str, key: tuple, retryable: bool) -> bool:
+        """Count a failed write; False once the key is given up on"""
+        with self._lock:
+            self._attempts[(kind, key)] += 1
+            if retryable and self._attempts[(kind, key)] <= VIEW_FLUSH_MAX_RETRIES:
+                return True
+            del self._attempts[(kind, key)]
+        logger.error(f"Dropping {kind} for {key} after a {'repeated' if retryable else 'permanent'} write failure")
+        return False
+
+    def flush_sketches(self) -> int:
+        with self._lock:
+            viewers, self._viewers = self._viewers, {}
+        for key, hashes in viewers.items():
+            try:
+                merged, retryable = merge_view_sketch(*key, hashes), True  # False: lost version races
+            except ConnectionFailure as e:
+                logger.warning(f"View sketch merge failed for {key}: {e}")
+                merged, retryable = False, True
+            except Exception as e:
+                logger.error(f"View sketch merge failed for {key}: {e}")
+                merged, retryable = False, False
+            if merged:
+                self._attempts.pop(("sketch", key), None)
+            elif self._should_retry("sketch", key, retryable):
+                with self._lock:
+                    self._viewers.setdefault(key, set()).update(hashes)
+        return len(viewers)
+
+    def write_batch(self, batch: Counter):
+        if VIEW_STORE == "timeseries":
+            self.write_events(batch)
+        else:
+            self.write_counters(batch)
 
+    def failed_writes(self, batch: Counter) -> dict:
+        """Write batch; returns {key: retryable} for the counters that were not written"""
+        keys = list(batch)
+        try:
+            self.write_batch(batch)
+            return {}
+        except BulkWriteError as e:
+            # Unordered: everything without a write error went through
+            return {
+                keys[error["index"]]: error.get("code") == 11000  # concurrent upsert race
+                for error in e.details.get("writeErrors", [])
+            }
+        except ConnectionFailure as e:
+            logger.warning(f"View flush failed, will retry {len(keys)} counters: {e}")
+            return {key: True for key in keys}
+        except Exception as e:
+            # Nothing was sent (typically a value BSON can't encode): isolate the bad counters
+            logger.error(f"View flush failed, writing {len(keys)} counters one by one: {e}")
+            failed = {}
+            for key in keys:
+                try:
+                    self.write_batch(Counter({key: batch[key]}))
+                except ConnectionFailure:
+                    failed[key] = True
+                except Exception:
+                    failed[key] = False
+            return failed
+
+    def flush(self) -> int:
+        self.flush_sketches()
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+        if not batch:
+            return 0
+        failed = self.failed_writes(batch)
+        requeue = Counter()
+        for key, views in batch.items():
+            if key not in failed:
+                self.written += views
+                self._attempts.pop(("views", key), None)
+            elif self._should_retry("views", key, failed[key]):
+                requeue[key] = views
+            else:
+                self.dropped += views
+        if requeue:
+            with self._lock:
+                self._pending.update(requeue)
+        return len(batch)
+
+    def write_events(self, batch: Counter):
+        # ts is the day the views were counted for, not the flush time: views buffered
+        # just before midnight still belong to that day
+        content_view_events.insert_many(
+            [
+                {"ts": view_day_start(day), "meta": {"type": media_type, "tmdbId": tmdb_id}, "views": views}
+                for (media_type, tmdb_id, day), views in batch.items()
+            ],
+            ordered=False
+        )
 
-@app.get("/api/public/top10")
-async def get_top10():
-    """
-    Return the top 10 most-viewed contents from the content_views collection.
-    Each item is enriched with TMDB metadata.
-    Falls back to TMDB popularity when no views are recorded yet.
-    """
-    # Fetch top 10 by views from DB
-    top_views = list(
-        content_views.find({}, {"_id": 0})
-        .sort("views", DESCENDING)
-        .limit(20)  # fetch extra to account for TMDB fetch failures
-    )
+    def write_counters(self, batch: Counter):
+        now = datetime.now(timezone.utc).isoformat()
+        operations = [
+            UpdateOne(
+                {"tmdbId": tmdb_id, "type": media_type, "date": day, "shard": random.randrange(VIEW_COUNTER_SHARDS)},
+                {
+                    "$inc": {"views": views},
+                    "$setOnInsert": {"createdAt": now},
+                    "$set": {"updatedAt": now}
+                },
+                upsert=True
+            )
+            for (media_type, tmdb_id, day), views in batch.items()
+        ]
+        self.collection.bulk_write(operations, ordered=False)
 
-    items = []
-    if top_views:
-        for i, record in enumerate(top_views):
-            tmdb_id = record["tmdbId"]
-            media_type = record["type"]
-            tmdb_data = await fetch_tmdb_data(f"/{media_type}/{tmdb_id}")
-            if not tmdb_data:
-                continue
-            items.append({
-                "tmdbId": tmdb_id,
-                "type": media_type,
-                "title": tmdb_data.get("title") or tmdb_data.get("name"),
-                "overview": tmdb_data.get("overview", ""),
-                "poster_path": tmdb_data.get("poster_path"),
-                "backdrop_path": tmdb_data.get("backdrop_path"),
-                "release_date": tmdb_data.get("release_date") or tmdb_data.get("first_air_date"),
-                "vote_average": tmdb_data.get("vote_average", 0),
-                "genre_ids": [g["id"] for g in tmdb_data.get("genres", [])],
-                "views": record.get("views", 0),
-                "position": len(items) + 1,
-            })
-            if len(items) >= 10:
-                break
+    def stats(self) -> dict:
+        with self._lock:
+            pending = sum(self._pending.values())
+            counters = len(self._pending)
+            sketches = len(self._viewers)
+        return {
+            "pendingViews": pending,
+            "pendingCounters": counters,
+            "pendingSketches": sketches,
+            "store": VIEW_STORE,
+            "received": self.received,
+            "written": self.written,
+            "dropped": self.dropped
+        }
 
-    # Fallback: use TMDB trending when no views recorded yet
-    if len(items) < 10:
-        trending_data = await fetch_tmdb_data("/trending/all/week", {"page": 1})
-        existing_ids = {it["tmdbId"] for it in items}
-        if trending_data and "results" in trending_data:
-            for item in trending_data["results"]:
-                tmdb_id = item.get("id")
-                if tmdb_id in existing_ids:
-                    continue
-                if is_anime_content(item):
-                    continue
-                media_type = item.get("media_type", "movie")
-                items.append({
-                    "tmdbId": tmdb_id,
-                    "type": media_type,
-                    "title": item.get("title") or item.get("name"),
-                    "overview": item.get("overview", ""),
-                    "poster_path": item.get("poster_path"),
-                    "backdrop_path": item.get("backdrop_path"),
-                    "release_date": item.get("release_date") or item.get("first_air_date"),
-                    "vote_average": item.get("vote_average", 0),
-                    "genre_ids": item.get("genre_ids", []),
-                    "views": 0,
-                    "position": len(items) + 1,
-                })
-                existing_ids.add(tmdb_id)
-                if len(items) >= 10:
-                    break
+view_ingestor = ViewIngestor(content_views)
+register_periodic_job(view_ingestor.flush, VIEW_FLUSH_INTERVAL_SECONDS)
 
-    # Re-assign positions
-    for i, item in enumerate(items):
-        item["position"] = i + 1
+def validate_view_media_type(media_type: str):
+    if media_type not in VIEW_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="media_type must be 'movie' or 'tv'")
 
-    return {"enabled": True, "items": items[:10]}
+class ViewRecord(BaseModel):
+    tmdb_id: int = Field(gt=0, le=MAX_TMDB_ID)
+    media_type: str  # "movie" or "tv"
+    viewer_id: Optional[str] = Field(None, min_length=1, max_length=VIEWER_ID_MAX_LENGTH)
 
+@app.post("/api/public/record-view")
+async def record_view(data: ViewRecord, request: Request):
+    """
+    Record a view for a piece of content.
+    Counted by the view ingestor and flushed to content_views in batches.
+    """
+    validate_view_media_type(data.media_type)
+    view_ingestor.add(data.tmdb_id, data.media_type, viewer=viewer_fingerprint(request, data.viewer_id))
+    return {"success": True}
+
+# navigator.sendBeacon caps payloads at ~64KB and cannot set headers, so the body
+# arrives as text/plain (or a JSON Blob) and is parsed by hand
+VIEW_BEACON_MAX_BYTES = int(os.environ.get("VIEW_BEACON_MAX_BYTES", "65536"))
+VIEW_BEACON_MAX_EVENTS = int(os.environ.get("VIEW_BEACON_MAX_EVENTS", "100"))
+
+@app.post("/api/public/views/beacon")
+async def record_view_beacon(request: Request):
+    """
+    Record a batch of views in one request.
+    Body: a JSON array of {tmdb_id, media_type} events, or {"events": [...], "viewer_id": ...}.
+    Invalid events are counted and skipped; the rest are applied as one counter update.
+    """
+    declared_length = request.headers.get("content-length")
+    if declared_length and declared_length.isdigit() and int(declared_length) > VIEW_BEACON_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Beacon payload too large")
+    # Content-Length may be absent (chunked upload): count bytes as they arrive
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > VIEW_BEACON_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="Beacon payload too large")
+    
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Beacon body must be JSON")
+    events = payload.get("events") if isinstance(payload, dict) else payload
+    if not isinstance(events, list):
+        raise HTTPException(status_code=400, detail="Beacon body must be a list of view events")
+    if len(events) > VIEW_BEACON_MAX_EVENTS:
+        raise HTTPException(status_code=413, detail=f"At most {VIEW_BEACON_MAX_EVENTS} events per beacon")
+    
+    counts = Counter()
+    rejected = 0
+    for event in events:
+        try:
+            counts[parse_playback_title(event)] += 1
+        except (AttributeError, KeyError, OverflowError, TypeError, ValueError):
+            rejected += 1
+    if counts:
+        viewer_id = payload.get("viewer_id") if isinstance(payload, dict) else None
+        view_ingestor.add_many(counts, viewer_fingerprint(request, viewer_id))
+    return {"success": True, "accepted": sum(counts.values()), "rejected": rejected}
 
 @app.get("/api/public/homepage/trending")
 async def get_homepage_trending():
@@ -2262,26 +3655,84 @@ async def get_homepage_latest():
 # TV SERIES ENDPOINTS - FROM TMDB
 # =====================
 
+# Seasons and episodes are read through tv_seasons/tv_episodes: managed shows are
+# already there from import, other shows are stored on first request. Local data is
+# refreshed from TMDB once older than the TTL for the show's production state, and
+# seasons or episodes TMDB no longer lists are deleted on refresh.
+# The cached unmanaged shows are disposable: a catalog rebuild swaps in collections
+# holding only managed shows, so it discards them, and while a rebuild runs the
+# read-through serves TMDB data without storing it. Admin stats count managed shows only.
+TV_FRESHNESS_IN_PRODUCTION_HOURS = float(os.environ.get("TV_FRESHNESS_IN_PRODUCTION_HOURS", "6"))
+TV_FRESHNESS_ENDED_HOURS = float(os.environ.get("TV_FRESHNESS_ENDED_HOURS", "168"))
+tv_series_meta.create_index("tmdbId", unique=True)
+
+def is_fresh(fetched_at: Optional[str], meta: Optional[dict]) -> bool:
+    if not fetched_at:
+        return False
+    in_production = meta.get("in_production", True) if meta else True
+    max_age = timedelta(hours=TV_FRESHNESS_IN_PRODUCTION_HOURS if in_production else TV_FRESHNESS_ENDED_HOURS)
+    return datetime.now(timezone.utc) - datetime.fromisoformat(fetched_at) < max_age
+
+async def load_tv_series(tmdb_id: int) -> Optional[tuple]:
+    """(meta, seasons) from the local collections, refreshed from TMDB when stale"""
+    meta = tv_series_meta.find_one({"tmdbId": tmdb_id}, {"_id": 0})
+    seasons = list(tv_seasons.find(
+        {"tmdbId": tmdb_id, "season_number": {"$gt": 0}}, {"_id": 0}
+    ).sort("season_number", ASCENDING))
+    complete = meta and len(seasons) >= meta.get("season_count", 0)
+    if complete and is_fresh(meta.get("fetchedAt"), meta):
+        return meta, seasons
+    
+    tv_data = await fetch_tmdb_data(f"/tv/{tmdb_id}")
+    if not tv_data:
+        return (meta or {}, seasons) if meta or seasons else None  # stale beats missing
+    store_tv_series_meta(tv_data)
+    if catalog_rebuild["running"]:
+        # Live tv_seasons is about to be replaced: don't write into it
+        return tv_series_meta.find_one({"tmdbId": tmdb_id}, {"_id": 0}), tv_season_summaries(tmdb_id, tv_data)
+    store_tv_season_summaries(tmdb_id, tv_data)
+    meta = tv_series_meta.find_one({"tmdbId": tmdb_id}, {"_id": 0})
+    seasons = list(tv_seasons.find(
+        {"tmdbId": tmdb_id, "season_number": {"$gt": 0}}, {"_id": 0}
+    ).sort("season_number", ASCENDING))
+    return meta, seasons
+
+async def load_tv_season(tmdb_id: int, season_number: int) -> Optional[dict]:
+    """A season with its episodes from the local collections, refreshed from TMDB when stale"""
+    season = tv_seasons.find_one({"tmdbId": tmdb_id, "season_number": season_number}, {"_id": 0})
+    meta = tv_series_meta.find_one({"tmdbId": tmdb_id}, {"_id": 0})
+    if not (season and is_fresh(season.get("episodesFetchedAt"), meta)):
+        season_data = await fetch_tmdb_data(f"/tv/{tmdb_id}/season/{season_number}")
+        if season_data:
+            if not catalog_rebuild["running"]:
+                store_tv_season(tmdb_id, season_number, season_data)
+            return season_data
+        if not season:
+            return None
+    season["episodes"] = list(tv_episodes.find(
+        {"tmdbId": tmdb_id, "season_number": season_number}, {"_id": 0}
+    ).sort("episode_number", ASCENDING))
+    return season
+
+def has_tv_season(tmdb_id: int, season_number: int) -> bool:
+    """Whether the stored show metadata lists the season (False while it's unknown)"""
+    meta = tv_series_meta.find_one({"tmdbId": tmdb_id}, {"season_count": 1})
+    return bool(meta) and 0 < season_number <= meta.get("season_count", 0)
+
 @app.get("/api/public/tv/{tmdb_id}/seasons")
 async def get_tv_seasons(tmdb_id: int):
     """Get all seasons for a TV show - OTTIMIZZATO per velocità"""
-    # Fetch TV show details from TMDB
-    tv_data = await fetch_tmdb_data(f"/tv/{tmdb_id}")
-    if not tv_data:
+    series = await load_tv_series(tmdb_id)
+    if not series:
         raise HTTPException(status_code=404, detail="TV show not found on TMDB")
+    meta, seasons_list = series
     
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     
-    # Get seasons from TMDB data
-    seasons_list = tv_data.get("seasons", [])
-    
     # Return ALL seasons (except specials), SENZA check vixsrc per velocità
     all_seasons = []
     for season in seasons_list:
         season_number = season.get("season_number", 0)
-        if season_number == 0:  # Skip specials
-            continue
-        
         season_air_date = season.get("air_date")
         
         # Check if season has aired
@@ -2302,9 +3753,9 @@ async def get_tv_seasons(tmdb_id: int):
     
     return {
         "tmdbId": tmdb_id,
-        "title": tv_data.get("name"),
-        "status": tv_data.get("status"),
-        "in_production": tv_data.get("in_production", False),
+        "title": meta.get("name"),
+        "status": meta.get("status"),
+        "in_production": meta.get("in_production", False),
         "total_seasons": len(all_seasons),
         "seasons": all_seasons
     }
@@ -2312,8 +3763,7 @@ async def get_tv_seasons(tmdb_id: int):
 @app.get("/api/public/tv/{tmdb_id}/season/{season_number}")
 async def get_tv_season_episodes(tmdb_id: int, season_number: int):
     """Get episodes for a specific season - OTTIMIZZATO per velocità"""
-    # Fetch season details from TMDB
-    season_data = await fetch_tmdb_data(f"/tv/{tmdb_id}/season/{season_number}")
+    season_data = await load_tv_season(tmdb_id, season_number)
     if not season_data:
         raise HTTPException(status_code=404, detail="Season not found on TMDB")
     
@@ -2377,6 +3827,10 @@ async def get_tv_season_episodes(tmdb_id: int, season_number: int):
         "air_date_it": format_italian_date(season_data.get("air_date"))
     }
     
+    # Viewers usually move on to the next season: warm it in the background, if there is one
+    if has_tv_season(tmdb_id, season_number + 1):
+        tv_prefetcher.schedule(("season", tmdb_id, season_number + 1))
+    
     return {
         "tmdbId": tmdb_id,
         "season": season_info,
@@ -2384,6 +3838,127 @@ async def get_tv_season_episodes(tmdb_id: int, season_number: int):
         "episodes": episodes_list
     }
 
+@app.get("/api/public/tv/{tmdb_id}/season/{season_number}/episode/{episode_number}/availability")
+async def get_episode_availability(tmdb_id: int, season_number: int, episode_number: int):
+    """vixsrc availability of one episode (cached, warmed by the prefetcher for auto-next)"""
+    available = await check_vixsrc_episode_availability(tmdb_id, season_number, episode_number)
+    return {"tmdbId": tmdb_id, "season": season_number, "episode": episode_number, "available": available}
+
+# =====================
+# NEXT SEASON / NEXT EPISODE PREFETCH
+# =====================
+
+# Opening season N schedules season N+1; starting episode E schedules E+1 (or the
+# first episode of the next season). Only seasons tv_series_meta lists are scheduled,
+# and the start hook needs a signed-in user, so junk ids can't crowd out real jobs.
+# A small bounded queue, deduplicated against queued and recently finished jobs, is
+# drained by low-priority workers that load the season into tv_seasons/tv_episodes and
+# warm the episode's vixsrc availability.
+# When the queue is full new jobs are dropped: prefetching is only ever a hint.
+TV_PREFETCH_QUEUE_SIZE = int(os.environ.get("TV_PREFETCH_QUEUE_SIZE", "256"))
+TV_PREFETCH_WORKERS = int(os.environ.get("TV_PREFETCH_WORKERS", "1"))
+TV_PREFETCH_DONE_TTL_SECONDS = float(os.environ.get("TV_PREFETCH_DONE_TTL_SECONDS", "600"))
+
+class TvPrefetcher:
+    """Deduplicated background warm-up of ("season", id, s) and ("episode", id, s, e) jobs"""
+
+    def __init__(self, max_size: int):
+        self.queue = asyncio.Queue(maxsize=max_size)
+        self._queued = set()
+        self._done = TTLCache(TV_PREFETCH_DONE_TTL_SECONDS, max_size=4096)
+        self.scheduled = 0
+        self.deduplicated = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+
+    def schedule(self, job: tuple) -> bool:
+        if job in self._queued or self._done.get(job):
+            self.deduplicated += 1
+            return False
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self._queued.add(job)
+        self.scheduled += 1
+        return True
+
+    async def warm_season(self, tmdb_id: int, season_number: int) -> Optional[dict]:
+        """Load a season locally and warm its first aired episode's availability"""
+        season = await load_tv_season(tmdb_id, season_number)
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        aired = [ep for ep in (season or {}).get("episodes", []) if ep.get("air_date") and ep["air_date"] <= today]
+        if aired:
+            await check_vixsrc_episode_availability(tmdb_id, season_number, aired[0]["episode_number"])
+        return season
+
+    async def run_job(self, job: tuple):
+        if job[0] == "season":
+            await self.warm_season(job[1], job[2])
+            return
+        _, tmdb_id, season_number, episode_number = job
+        season = await load_tv_season(tmdb_id, season_number)
+        numbers = {ep.get("episode_number") for ep in (season or {}).get("episodes", [])}
+        if episode_number in numbers:
+            await check_vixsrc_episode_availability(tmdb_id, season_number, episode_number)
+        elif season and has_tv_season(tmdb_id, season_number + 1):
+            # Past the season finale: auto-next continues with the next season
+            await self.warm_season(tmdb_id, season_number + 1)
+
+    async def run(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.run_job(job)
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"TV prefetch {job} failed: {e}")
+            finally:
+                self._queued.discard(job)
+                self._done.set(job, True)
+                self.queue.task_done()
+            await asyncio.sleep(0)  # yield to request handlers between jobs
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "scheduled": self.scheduled,
+            "deduplicated": self.deduplicated,
+            "dropped": self.dropped,
+            "completed": self.completed,
+            "failed": self.failed
+        }
+
+tv_prefetcher = TvPrefetcher(TV_PREFETCH_QUEUE_SIZE)
+
+@app.on_event("startup")
+async def start_tv_prefetch_workers():
+    for _ in range(TV_PREFETCH_WORKERS):
+        background_tasks.append(asyncio.create_task(tv_prefetcher.run()))
+
+async def schedule_next_episode(tmdb_id: int, season: Optional[int], episode: Optional[int]) -> bool:
+    """Queue episode + 1 of a season tv_series_meta knows about; every job costs TMDB and vixsrc calls"""
+    if not season or not episode or episode < 1:
+        return False
+    if not await asyncio.to_thread(has_tv_season, tmdb_id, season):
+        return False
+    return tv_prefetcher.schedule(("episode", tmdb_id, season, episode + 1))
+
+class PlaybackStart(BaseModel):
+    tmdb_id: int
+    media_type: str  # "movie" or "tv"
+    season: Optional[int] = None
+    episode: Optional[int] = None
+
+@app.post("/api/public/playback/start")
+async def playback_start(data: PlaybackStart, user = Depends(get_current_user)):
+    """Player start hook: prefetch what auto-next will need"""
+    scheduled = data.media_type == "tv" and await schedule_next_episode(data.tmdb_id, data.season, data.episode)
+    return {"success": True, "prefetchScheduled": scheduled}
+
 @app.get("/api/public/content/{tmdb_id}")
 async def get_content_by_tmdb_id(tmdb_id: int, media_type: str = "movie"):
     """Get single content by TMDB ID directly from TMDB, verify vixsrc availability"""
@@ -2431,15 +4006,99 @@ async def get_content_by_tmdb_id(tmdb_id: int, media_type: str = "movie"):
     
     return result
 
+# Cursor mode fills each response with `limit` available items: TMDB pages are filtered a page
+# at a time with concurrent availability checks, and when a page runs short the next
+# TMDB_LOOKAHEAD_PAGES pages are requested together. The cursor records the TMDB page
+# and the offset inside it where the next request resumes. A request walks at most
+# TMDB_MAX_PAGES_PER_REQUEST pages: past that it returns what it has plus the cursor.
+TMDB_LOOKAHEAD_PAGES = int(os.environ.get("TMDB_LOOKAHEAD_PAGES", "2"))
+TMDB_MAX_PAGES_PER_REQUEST = max(1, int(os.environ.get("TMDB_MAX_PAGES_PER_REQUEST", "10")))
+TMDB_MAX_PAGE = 500  # TMDB rejects later pages
+
+def cursor_int(position: dict, key: str, default: int) -> int:
+    value = position.get(key, default)
+    if not isinstance(value, int) or value < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
+
+async def availability_flags(candidates: List[tuple], verify_vixsrc: bool) -> List[bool]:
+    """vixsrc availability of each (media_type, item), checked concurrently"""
+    if not verify_vixsrc:
+        return [True] * len(candidates)
+    return await asyncio.gather(*(
+        check_vixsrc_with_cache(item.get("tmdbId") or item.get("id"), media_type)
+        for media_type, item in candidates
+    ))
+
+async def fill_from_tmdb(
+    endpoint: str,
+    params: dict,
+    item_type,
+    position: dict,
+    limit: int,
+    verify_vixsrc: bool
+) -> tuple:
+    """
+    Collect `limit` available items from a paginated TMDB list starting at
+    position {"p": page, "o": offset}. item_type(item) gives the media type, or None
+    to skip the item. Returns ([(media_type, item)], next position or None).
+    """
+    start_page = page = max(cursor_int(position, "p", 1), 1)
+    offset = cursor_int(position, "o", 0)
+    last_page = TMDB_MAX_PAGE
+    stop_page = start_page + TMDB_MAX_PAGES_PER_REQUEST - 1
+    fetches = {}
+    collected = []
+    try:
+        while page <= last_page:
+            if page not in fetches:
+                # The first page alone; once a page runs short, the lookahead too
+                lookahead = 0 if page == start_page else TMDB_LOOKAHEAD_PAGES
+                for p in range(page, min(page + lookahead, last_page, stop_page) + 1):
+                    fetches.setdefault(p, asyncio.ensure_future(fetch_tmdb_data(endpoint, {**params, "page": p})))
+            data = await fetches[page]
+            if not data or "results" not in data:
+                return collected, None
+            last_page = min(data.get("total_pages") or page, TMDB_MAX_PAGE)
+            results = data["results"]
+            candidates = [
+                (index, media_type, results[index])
+                for index in range(offset, len(results))
+                for media_type in [item_type(results[index])]
+                if media_type
+            ]
+            flags = await availability_flags([(t, item) for _, t, item in candidates], verify_vixsrc)
+            for (index, media_type, item), available in zip(candidates, flags):
+                if not available:
+                    continue
+                collected.append((media_type, item))
+                if len(collected) == limit:
+                    if index + 1 < len(results):
+                        return collected, {"p": page, "o": index + 1}
+                    return collected, ({"p": page + 1, "o": 0} if page < last_page else None)
+            if page >= stop_page:
+                return collected, ({"p": page + 1, "o": 0} if page < last_page else None)
+            page, offset = page + 1, 0
+        return collected, None
+    finally:
+        for fetch in fetches.values():
+            if not fetch.done():
+                fetch.cancel()
+
 @app.get("/api/public/contents/by-section/{section_type}/{media_type}")
 async def get_contents_by_section(
     section_type: str,
     media_type: str,
     page: int = 1,
-    limit: int = 20,
-    verify_vixsrc: bool = True
+    limit: int = Query(20, ge=1, le=100),
+    verify_vixsrc: bool = True,
+    cursor: Optional[str] = None
 ):
-    """Get contents by section directly from TMDB, filtered by vixsrc availability"""
+    """
+    Get contents by section directly from TMDB, filtered by vixsrc availability.
+    Pass cursor (empty for the first page) to get `limit` available items per
+    response (fewer when the page budget runs out) and a nextCursor to continue from.
+    """
     # Map section type to TMDB endpoint
     endpoint_map = {
         "popular": f"/{media_type}/popular",
@@ -2452,6 +4111,20 @@ async def get_contents_by_section(
     }
     
     endpoint = endpoint_map.get(section_type, f"/{media_type}/popular")
+    
+    if cursor is not None:
+        position = decode_cursor(cursor) if cursor else {"p": 1, "o": 0}
+        collected, next_position = await fill_from_tmdb(
+            endpoint, {}, lambda item: item.get("media_type", media_type),
+            position, limit, verify_vixsrc
+        )
+        items = [search_result_item(item, item_type) for item_type, item in collected]
+        return {
+            "items": items,
+            "total": len(items),
+            "nextCursor": encode_cursor(next_position) if next_position else None
+        }
+    
     data = await fetch_tmdb_data(endpoint, {"page": page})
     
     if not data or "results" not in data:
@@ -2488,13 +4161,396 @@ async def get_contents_by_section(
         "totalPages": 1
     }
 
+# =====================
+# LOCAL CATALOG SEARCH
+# =====================
+
+# Every movie/TV title we have seen - managed contents plus any title in a TMDB
+# response - is kept in an in-memory inverted trigram index over its normalized
+# Italian and original titles, with vixsrc availability joined in. Entries are
+# persisted to search_catalog so a restart only reloads and re-syncs what changed.
+SEARCH_CATALOG_FLUSH_INTERVAL_SECONDS = float(os.environ.get("SEARCH_CATALOG_FLUSH_INTERVAL_SECONDS", "30"))
+SEARCH_MIN_TRIGRAM_OVERLAP = 0.5
+SEARCH_LOCAL_MIN_HITS = int(os.environ.get("SEARCH_LOCAL_MIN_HITS", "5"))
+SEARCH_MAX_CANDIDATES = 200
+search_catalog = db["search_catalog"]
+
+TMDB_ENDPOINT_TYPE = re.compile(r"^/(?:trending/|discover/|search/)?(movie|tv)\b")
+TMDB_DETAILS_ENDPOINT = re.compile(r"^/(movie|tv)/\d+$")
+
+def search_rank(match: dict) -> tuple:
+    """Sort key of a search match (higher first); the key at the end makes the order total"""
+    return (match["exact"], match["overlap"], match.get("popularity") or 0, f"{match['type']}:{match['tmdbId']}")
+
+class CatalogSearchIndex:
+    """Inverted trigram index over catalog titles, keyed by 'type:tmdbId'"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._entries = {}
+        self._postings = {}  # trigram -> {key}
+        self._word_prefixes = {}  # first 1-2 letters of a title word -> {key}, for queries too short for trigrams
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self.version = 0
+
+    @staticmethod
+    def _short_prefixes(entry: dict) -> set:
+        return {word[:length] for t in entry["title_normalized"] for word in t.split() for length in (1, 2)}
+
+    def _index(self, key: str, entry: dict):
+        self.version += 1
+        previous = self._entries.get(key)
+        if previous:
+            for gram in previous["title_ngrams"]:
+                self._postings.get(gram, set()).discard(key)
+            for prefix in self._short_prefixes(previous):
+                self._word_prefixes.get(prefix, set()).discard(key)
+        self._entries[key] = entry
+        for gram in entry["title_ngrams"]:
+            self._postings.setdefault(gram, set()).add(key)
+        for prefix in self._short_prefixes(entry):
+            self._word_prefixes.setdefault(prefix, set()).add(key)
+
+    def add(self, item: dict, media_type: Optional[str], available: Optional[bool] = None):
+        """Index a TMDB result or a contents document; items without a title are ignored"""
+        tmdb_id = item.get("tmdbId") or item.get("id")
+        title = item.get("title") or item.get("name")
+        if media_type not in ("movie", "tv") or not tmdb_id or not title:
+            return
+        original_title = item.get("original_title") or item.get("original_name")
+        entry = {
+            "tmdbId": tmdb_id,
+            "type": media_type,
+            "title": title,
+            "original_title": original_title,
+            "overview": item.get("overview"),
+            "poster_path": item.get("poster_path"),
+            "backdrop_path": item.get("backdrop_path"),
+            "release_date": item.get("release_date") or item.get("first_air_date"),
+            "vote_average": item.get("vote_average", 0),
+            "popularity": item.get("popularity", 0),
+            **title_search_fields(title, original_title)
+        }
+        key = f"{media_type}:{tmdb_id}"
+        with self._lock:
+            previous = self._entries.get(key)
+            entry["available"] = previous.get("available") if available is None and previous else available
+            if previous != entry:
+                self._index(key, entry)
+                self._dirty.add(key)
+
+    def set_availability(self, tmdb_id: int, media_type: str, available: bool):
+        key = f"{media_type}:{tmdb_id}"
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.get("available") != available:
+                entry["available"] = available
+                self._dirty.add(key)
+                self.version += 1
+
+    def observe_tmdb(self, endpoint: str, data):
+        """Index the titles found in any TMDB response"""
+        if not isinstance(data, dict):
+            return
+        match = TMDB_ENDPOINT_TYPE.match(endpoint)
+        default_type = match.group(1) if match else None
+        if isinstance(data.get("results"), list):
+            for item in data["results"]:
+                if isinstance(item, dict):
+                    self.add(item, item.get("media_type", default_type))
+        elif TMDB_DETAILS_ENDPOINT.match(endpoint):
+            self.add(data, default_type)
+
+    def search(self, query: str, limit: int = SEARCH_MAX_CANDIDATES) -> List[dict]:
+        """Best matches first: substring hits, then trigram overlap, then popularity"""
+        normalized = normalize_title(query)
+        if not normalized:
+            return []
+        grams = title_trigrams(normalized)
+        with self._lock:
+            if grams:
+                hits = Counter()
+                for gram in grams:
+                    hits.update(self._postings.get(gram, ()))
+                candidates = [
+                    (key, count / len(grams)) for key, count in hits.items()
+                    if count / len(grams) >= SEARCH_MIN_TRIGRAM_OVERLAP
+                ]
+            else:
+                # Too short for trigrams: match the start of any title word
+                candidates = [(key, 1.0) for key in self._word_prefixes.get(normalized, ())]
+            scored = []
+            for key, overlap in candidates:
+                entry = self._entries[key]
+                exact = any(normalized in t for t in entry["title_normalized"])
+                scored.append(dict(entry, exact=exact, overlap=overlap))
+        scored.sort(key=search_rank, reverse=True)
+        return scored[:limit]
+
+    def load(self):
+        """Rebuild from search_catalog, then sync managed contents and known availability"""
+        with self._lock:
+            for doc in self.collection.find({}):
+                key = doc.pop("_id")
+                self._index(key, doc)
+        for doc in contents.find({}, {"_id": 0}):
+            self.add(doc, doc.get("type"), doc.get("vixsrc_available"))
+        for row in vixsrc_cache.find({"season": None}, {"_id": 0, "tmdbId": 1, "type": 1, "available": 1}):
+            if "available" in row:
+                self.set_availability(row["tmdbId"], row.get("type"), row["available"])
+        self.flush()
+
+    def flush(self) -> int:
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            entries = {key: dict(self._entries[key]) for key in dirty}
+        if not entries:
+            return 0
+        try:
+            self.collection.bulk_write(
+                [UpdateOne({"_id": key}, {"$set": entry}, upsert=True) for key, entry in entries.items()],
+                ordered=False
+            )
+        except Exception as e:
+            logger.error(f"Search catalog flush failed, retrying {len(entries)} entries: {e}")
+            with self._lock:
+                self._dirty.update(dirty)
+        return len(entries)
+
+    def snapshot(self) -> tuple:
+        """(version, entries) for building derived structures outside the lock"""
+        with self._lock:
+            return self.version, list(self._entries.items())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"titles": len(self._entries), "trigrams": len(self._postings), "pending": len(self._dirty)}
+
+catalog_search_index = CatalogSearchIndex(search_catalog)
+catalog_search_index.load()
+register_periodic_job(catalog_search_index.flush, SEARCH_CATALOG_FLUSH_INTERVAL_SECONDS)
+
+# Autocomplete runs on a sorted array of every word-start suffix of every normalized
+# title ("la citta incantata", "citta incantata", "incantata"): a prefix is a bisect
+# range, ranked by popularity. The array is rebuilt in the background when the index
+# changes and recent prefixes are served from an LRU.
+SUGGEST_REFRESH_INTERVAL_SECONDS = float(os.environ.get("SUGGEST_REFRESH_INTERVAL_SECONDS", "30"))
+SUGGEST_MAX_RESULTS = 20
+SUGGEST_PRECOMPUTED_PREFIX_LENGTH = 3  # shorter prefixes span the widest ranges
+
+class TitleSuggester:
+    """Popularity-weighted prefix lookup over the catalog search index"""
+
+    def __init__(self, index: CatalogSearchIndex):
+        self.index = index
+        self.version = -1
+        # (sorted word-start suffixes, parallel (weight, key) rows, key -> suggestion payload,
+        # short prefix -> ranked keys); replaced as one tuple so readers never mix two refreshes
+        self._state = ([], [], {}, {})
+        self._cache = TTLCache(SUGGEST_REFRESH_INTERVAL_SECONDS, max_size=2048)
+
+    def refresh(self) -> bool:
+        version, entries = self.index.snapshot()
+        if version == self.version:
+            return False
+        pairs = []
+        titles = {}
+        for key, entry in entries:
+            if entry.get("available") is False:
+                continue
+            weight = entry.get("popularity") or 0
+            titles[key] = {
+                "tmdbId": entry["tmdbId"],
+                "type": entry["type"],
+                "title": entry["title"],
+                "original_title": entry.get("original_title"),
+                "release_date": entry.get("release_date"),
+                "poster_path": entry.get("poster_path")
+            }
+            for normalized in entry["title_normalized"]:
+                words = normalized.split()
+                for i in range(len(words)):
+                    pairs.append((" ".join(words[i:]), weight, key))
+        pairs.sort(key=lambda pair: pair[0])
+        phrases = [pair[0] for pair in pairs]
+        rows = [(pair[1], pair[2]) for pair in pairs]
+        short = {}
+        for length in range(1, SUGGEST_PRECOMPUTED_PREFIX_LENGTH + 1):
+            start = 0
+            while start < len(phrases):
+                if len(phrases[start]) < length:
+                    start += 1  # "b" sorts before "ba...": step over it, don't range on it
+                    continue
+                prefix = phrases[start][:length]
+                end = bisect.bisect_left(phrases, prefix + "\uffff", start)
+                short[prefix] = self._top_keys(rows, start, end, SUGGEST_MAX_RESULTS)
+                start = end
+        self._state = (phrases, rows, titles, short)
+        self.version = version
+        self._cache.clear()
+        return True
+
+    @staticmethod
+    def _top_keys(rows: list, lo: int, hi: int, k: int) -> List[str]:
+        best = {}
+        for weight, key in rows[lo:hi]:
+            if weight >= best.get(key, -1):
+                best[key] = weight
+        return [key for key, _ in heapq.nlargest(k, best.items(), key=lambda item: item[1])]
+
+    def suggest(self, query: str, k: int) -> List[dict]:
+        prefix = normalize_title(query)
+        if not prefix:
+            return []
+        if self.version < 0:
+            self.refresh()
+        cached = self._cache.get((prefix, k))
+        if cached is not None:
+            return cached
+        phrases, rows, titles, short = self._state
+        if len(prefix) <= SUGGEST_PRECOMPUTED_PREFIX_LENGTH:
+            keys = short.get(prefix, [])[:k]
+        else:
+            lo = bisect.bisect_left(phrases, prefix)
+            hi = bisect.bisect_left(phrases, prefix + "\uffff", lo)
+            keys = self._top_keys(rows, lo, hi, k)
+        result = [titles[key] for key in keys]
+        self._cache.set((prefix, k), result)
+        return result
+
+    def stats(self) -> dict:
+        return {"phrases": len(self._state[0]), "version": self.version, "cache": self._cache.stats()}
+
+title_suggester = TitleSuggester(catalog_search_index)
+register_periodic_job(title_suggester.refresh, SUGGEST_REFRESH_INTERVAL_SECONDS, flush_on_shutdown=False)
+
+@app.get("/api/public/search/suggest")
+def suggest_titles(q: str, limit: int = Query(8, ge=1, le=SUGGEST_MAX_RESULTS)):
+    """Title autocomplete from the local catalog, most popular first"""
+    return {"query": q, "items": title_suggester.suggest(q, limit)}
+
+def search_result_item(item: dict, media_type: str) -> dict:
+    return {
+        "tmdbId": item.get("tmdbId") or item.get("id"),
+        "type": media_type,
+        "title": item.get("title") or item.get("name"),
+        "overview": item.get("overview"),
+        "poster_path": item.get("poster_path"),
+        "backdrop_path": item.get("backdrop_path"),
+        "release_date": item.get("release_date") or item.get("first_air_date"),
+        "release_date_it": format_italian_date(item.get("release_date") or item.get("first_air_date")),
+        "vote_average": item.get("vote_average", 0),
+        "popularity": item.get("popularity", 0),
+        "vixsrc_available": True
+    }
+
+async def search_local_catalog(matches: List[dict], page: int, limit: int, verify_vixsrc: bool) -> dict:
+    """Page through local matches, resolving unknown availability a page at a time"""
+    wanted = page * limit
+    available = []
+    for start in range(0, len(matches), limit):
+        chunk = [m for m in matches[start:start + limit] if m.get("available") is not False]
+        if verify_vixsrc:
+            unknown = [m for m in chunk if m.get("available") is None]
+            results = await asyncio.gather(*(check_vixsrc_with_cache(m["tmdbId"], m["type"]) for m in unknown))
+            rejected = {m["tmdbId"] for m, ok in zip(unknown, results) if not ok}
+            chunk = [m for m in chunk if m["tmdbId"] not in rejected]
+        available.extend(chunk)
+        if len(available) >= wanted:
+            break
+    # Titles not yet checked count as matches: the total is an upper bound, never a page's worth
+    total = sum(1 for m in matches if m.get("available") is not False)
+    return {
+        "items": [search_result_item(m, m["type"]) for m in available[wanted - limit:wanted]],
+        "total": total,
+        "page": page,
+        "totalPages": max(1, -(-total // limit)),
+        "source": "local"
+    }
+
+def search_cursor_rank(position: dict) -> Optional[tuple]:
+    """The search_rank a local search cursor resumes after (None: from the top)"""
+    rank = position.get("k")
+    if rank is None:
+        return None
+    if (
+        not isinstance(rank, list) or len(rank) != 4 or not isinstance(rank[0], bool)
+        or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in rank[1:3])
+        or not isinstance(rank[3], str)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(rank)
+
+async def search_local_from(matches: List[dict], after: Optional[tuple], limit: int, verify_vixsrc: bool) -> tuple:
+    """
+    `limit` available local matches ranked below `after`; returns ([(media_type, match)],
+    rank of the last match consumed, or None at the end). Cursors hold a rank rather than
+    an offset, so titles added to the index between requests don't shift the pages.
+    """
+    collected = []
+    index = 0 if after is None else next((i for i, m in enumerate(matches) if search_rank(m) < after), len(matches))
+    while index < len(matches) and len(collected) < limit:
+        window = [(i, m) for i, m in enumerate(matches[index:index + limit], start=index)]
+        index += len(window)
+        candidates = [(i, m) for i, m in window if m.get("available") is not False]
+        unknown = [(i, m) for i, m in candidates if m.get("available") is None]
+        flags = await availability_flags([(m["type"], m) for _, m in unknown], verify_vixsrc)
+        rejected = {i for (i, _), available in zip(unknown, flags) if not available}
+        for i, m in candidates:
+            if i in rejected:
+                continue
+            collected.append((m["type"], m))
+            if len(collected) == limit:
+                index = i + 1
+                break
+    return collected, (search_rank(matches[index - 1]) if index < len(matches) else None)
+
 @app.get("/api/public/search")
-async def search_contents(q: str, page: int = 1, limit: int = 20, verify_vixsrc: bool = True):
-    """Search contents on TMDB, filtered by vixsrc availability"""
+async def search_contents(
+    q: str,
+    page: int = 1,
+    limit: int = Query(20, ge=1, le=100),
+    verify_vixsrc: bool = True,
+    cursor: Optional[str] = None
+):
+    """
+    Search contents in the local catalog index, falling back to TMDB when local recall is poor.
+    Pass cursor (empty for the first page) to get `limit` available items per
+    response (fewer when the page budget runs out) and a nextCursor to continue from.
+    """
     if not q or len(q) < 2:
         return {"items": [], "total": 0}
     
-    # Search on TMDB
+    matches = catalog_search_index.search(q)
+    strong = sum(1 for m in matches if m["exact"] and m.get("available") is not False)
+    local = strong >= min(limit, SEARCH_LOCAL_MIN_HITS)
+    
+    if cursor is not None:
+        position = decode_cursor(cursor) if cursor else {"src": "local" if local else "tmdb"}
+        if position.get("src") == "local":
+            collected, last_rank = await search_local_from(matches, search_cursor_rank(position), limit, verify_vixsrc)
+            next_position = {"src": "local", "k": list(last_rank)} if last_rank is not None else None
+        else:
+            # fetch_tmdb_data feeds every TMDB page into the local index, as on the page path
+            collected, next_position = await fill_from_tmdb(
+                "/search/multi", {"query": q},
+                lambda item: item.get("media_type") if item.get("media_type") in ("movie", "tv") else None,
+                position, limit, verify_vixsrc
+            )
+            if next_position:
+                next_position["src"] = "tmdb"
+        items = [search_result_item(item, media_type) for media_type, item in collected]
+        return {
+            "items": items,
+            "total": len(items),
+            "nextCursor": encode_cursor(next_position) if next_position else None
+        }
+    
+    if local:
+        return await search_local_catalog(matches, max(page, 1), limit, verify_vixsrc)
+    
+    # Search on TMDB (its results feed the local index for next time)
     data = await fetch_tmdb_data("/search/multi", {"query": q, "page": page})
     
     if not data or "results" not in data:
@@ -2513,19 +4569,7 @@ async def search_contents(q: str, page: int = 1, limit: int = 20, verify_vixsrc:
             if not is_available:
                 continue
         
-        items.append({
-            "tmdbId": tmdb_id,
-            "type": media_type,
-            "title": item.get("title") or item.get("name"),
-            "overview": item.get("overview"),
-            "poster_path": item.get("poster_path"),
-            "backdrop_path": item.get("backdrop_path"),
-            "release_date": item.get("release_date") or item.get("first_air_date"),
-            "release_date_it": format_italian_date(item.get("release_date") or item.get("first_air_date")),
-            "vote_average": item.get("vote_average", 0),
-            "popularity": item.get("popularity", 0),
-            "vixsrc_available": True
-        })
+        items.append(search_result_item(item, media_type))
     
     return {
         "items": items[:limit],
@@ -2534,6 +4578,404 @@ async def search_contents(q: str, page: int = 1, limit: int = 20, verify_vixsrc:
         "totalPages": data.get("total_pages", 1)
     }
 
+# =====================
+# INDEX MANAGEMENT
+# =====================
+
+# Per-user title state is queried by {user_id, media_id, media_type}; ensure_unique_index
+# deduplicates existing rows (keeping the oldest, or the newest with keep="last")
+# before building the unique index on that key
+USER_TITLE_KEY = [("user_id", ASCENDING), ("media_id", ASCENDING), ("media_type", ASCENDING)]
+
+def dedupe_collection(collection, key_fields: List[str], keep: str = "first") -> int:
+    """Delete rows sharing the same key_fields values, keeping one per key; returns rows removed"""
+    pipeline = [
+        {"$sort": {"_id": 1}},
+        {"$group": {
+            "_id": {field: f"${field}" for field in key_fields},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    removed = 0
+    for group in collection.aggregate(pipeline, allowDiskUse=True):
+        ids = group["ids"]
+        extra = ids[1:] if keep == "first" else ids[:-1]
+        removed += collection.delete_many({"_id": {"$in": extra}}).deleted_count
+    return removed
+
+def ensure_unique_index(collection, keys: List[tuple], keep: str = "first"):
+    """Create a unique compound index, deduplicating existing rows first"""
+    name = "_".join(f"{field}_{direction}" for field, direction in keys)
+    existing = collection.index_information().get(name)
+    if existing and existing.get("unique"):
+        return
+    
+    key_fields = [field for field, _ in keys]
+    for attempt in range(2):
+        removed = dedupe_collection(collection, key_fields, keep)
+        if removed:
+            logger.info(f"Removed {removed} duplicate rows from {collection.name}")
+        try:
+            if existing:
+                # A non-unique index with the same keys must go first
+                collection.drop_index(name)
+                existing = None
+            collection.create_index(keys, unique=True, name=name)
+            return
+        except DuplicateKeyError:
+            # Rows written between dedupe and index build - try once more
+            if attempt:
+                raise
+
+def plan_stages(plan: dict) -> List[str]:
+    """Flatten the stage names of an explain() plan tree"""
+    plan = plan.get("queryPlan", plan)
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages += plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return [stage for stage in stages if stage]
+
+def explain_query(collection, query: dict, projection: Optional[dict] = None) -> dict:
+    """Report the plan stages of a find() and whether it uses an index"""
+    plan = collection.find(query, projection).explain()
+    winning = plan.get("queryPlanner", {}).get("winningPlan", {})
+    stages = plan_stages(winning)
+    indexed = "IXSCAN" in stages or "IDHACK" in stages
+    return {
+        "collection": collection.name,
+        "query": sorted(query),
+        "stages": stages,
+        "indexed": indexed
+    }
+
+# Existence checks only need to know a row matched: return one small field, not the document
+USER_TITLE_EXISTS_PROJECTION = {"_id": 0, "user_id": 1}
+
+def verify_user_title_queries() -> List[dict]:
+    """explain() every hot per-title query against sample values"""
+    sample = {"user_id": "explain-check", "media_id": 0, "media_type": "movie"}
+    return [
+        explain_query(user_title_state, dict(sample, in_list=True), USER_TITLE_EXISTS_PROJECTION),
+        explain_query(user_title_state, dict(sample, liked=True), USER_TITLE_EXISTS_PROJECTION),
+        explain_query(user_title_state, sample, {"_id": 0, "rating": 1}),
+        explain_query(
+            user_title_state,
+            {"user_id": "explain-check", "media_id": {"$in": [0, 1]}},
+            {"_id": 0}
+        ),
+    ]
+
+@app.get("/api/admin/indexes/verify")
+def verify_indexes(admin = Depends(get_current_admin)):
+    """Explain the hot per-user title queries and report index usage"""
+    results = verify_user_title_queries()
+    return {"ok": all(result["indexed"] for result in results), "queries": results}
+
+# =====================
+# USER TITLE STATE STORE
+# =====================
+
+# One document per (user_id, media_id, media_type) holding every per-title flag:
+#   in_list, list_added_at, title, poster_path, backdrop_path   - "My list"
+#   liked, liked_at                                             - likes
+#   rating, rating_updated_at                                   - ratings (1-5)
+#   progress {...}, progress_updated_at                         - continue watching
+# Every write is a single atomic (upsert) operation on that document.
+
+# A worker that holds a migration's entry for longer than this is presumed dead
+MIGRATION_LEASE_SECONDS = float(os.environ.get("MIGRATION_LEASE_SECONDS", "600"))
+
+def claim_migration(name: str, idempotent: bool) -> bool:
+    """Take the schema_migrations entry as a lock; False if it's done or held by someone else"""
+    now = datetime.now(timezone.utc)
+    try:
+        schema_migrations.insert_one({"_id": name, "startedAt": now.isoformat()})
+        return True
+    except DuplicateKeyError:
+        pass
+    if idempotent:
+        # Safe to rerun: take over a run that failed or whose worker stopped renewing the lease
+        stale = (now - timedelta(seconds=MIGRATION_LEASE_SECONDS)).isoformat()
+        taken = schema_migrations.find_one_and_update(
+            {
+                "_id": name,
+                "completedAt": {"$exists": False},
+                "$or": [{"error": {"$exists": True}}, {"startedAt": {"$lt": stale}}]
+            },
+            {"$set": {"startedAt": now.isoformat()}, "$unset": {"error": ""}}
+        )
+        if taken:
+            logger.warning(f"Retrying migration {name} (previous run: {taken.get('error') or 'abandoned'})")
+            return True
+    marker = schema_migrations.find_one({"_id": name}) or {}
+    if not marker.get("completedAt"):
+        # Another worker is running it, or a run that isn't safe to repeat died half way:
+        # rerunning could copy rows twice, so an operator has to clear the entry
+        logger.warning(f"Migration {name} started at {marker.get('startedAt')} has not completed; skipping")
+    return False
+
+def run_migration_once(name: str, migrate, idempotent: bool = False):
+    """Run migrate() in exactly one worker until it completes; idempotent ones are retried after a failure"""
+    if not claim_migration(name, idempotent):
+        return
+    logger.info(f"Running migration {name}")
+    try:
+        result = migrate()
+    except Exception as e:
+        schema_migrations.update_one({"_id": name}, {"$set": {"error": str(e)}})
+        raise
+    schema_migrations.update_one(
+        {"_id": name},
+        {"$set": {"completedAt": datetime.now(timezone.utc).isoformat(), "result": result}}
+    )
+    logger.info(f"Migration {name} done: {result}")
+
+def title_state_key(user_id: str, media_id: int, media_type: str) -> dict:
+    return {"user_id": user_id, "media_id": media_id, "media_type": media_type}
+
+def migrate_user_title_state() -> dict:
+    """Fold user_lists, user_likes, user_ratings and watch_progress into user_title_state"""
+    moved = {}
+    sources = [
+        (user_lists, lambda row: {
+            "in_list": True,
+            "list_added_at": row.get("added_at"),
+            "title": row.get("title"),
+            "poster_path": row.get("poster_path"),
+            "backdrop_path": row.get("backdrop_path")
+        }),
+        (user_likes, lambda row: {"liked": True, "liked_at": row.get("liked_at")}),
+        (user_ratings, lambda row: {"rating": row.get("rating", 0), "rating_updated_at": row.get("updated_at")}),
+    ]
+    for collection, fields in sources:
+        operations = []
+        moved[collection.name] = 0
+        for row in collection.find({}, {"_id": 0}):
+            key = title_state_key(row.get("user_id"), row.get("media_id"), row.get("media_type"))
+            operations.append(UpdateOne(key, {"$set": fields(row)}, upsert=True))
+            if len(operations) >= 1000:
+                moved[collection.name] += len(operations)
+                user_title_state.bulk_write(operations, ordered=False)
+                operations = []
+        if operations:
+            moved[collection.name] += len(operations)
+            user_title_state.bulk_write(operations, ordered=False)
+    
+    operations = []
+    moved["watch_progress"] = 0
+    for row in watch_progress.find({}, {"_id": 0}):
+        user_id = row.pop("user_id", None)
+        key = title_state_key(user_id, row.get("tmdb_id"), row.get("media_type"))
+        operations.append(UpdateOne(
+            key,
+            {"$set": {"progress": row, "progress_updated_at": row.get("updated_at")}},
+            upsert=True
+        ))
+        if len(operations) >= 1000:
+            moved["watch_progress"] += len(operations)
+            user_title_state.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        moved["watch_progress"] += len(operations)
+        user_title_state.bulk_write(operations, ordered=False)
+    return moved
+
+def ensure_user_title_state_indexes():
+    ensure_unique_index(user_title_state, USER_TITLE_KEY)
+    user_title_state.create_index([("user_id", ASCENDING), ("in_list", ASCENDING), ("list_added_at", DESCENDING)])
+    user_title_state.create_index([("user_id", ASCENDING), ("liked", ASCENDING)])
+    user_title_state.create_index(
+        [("user_id", ASCENDING), ("progress_updated_at", DESCENDING)],
+        partialFilterExpression={"progress_updated_at": {"$exists": True}}
+    )
+
+ensure_user_title_state_indexes()
+run_migration_once("user_title_state_v1", migrate_user_title_state, idempotent=True)  # $set upserts only
+
+def build_progress_doc(data) -> dict:
+    """Continue-watching entry as returned by the watch-progress endpoints"""
+    doc = {
+        "tmdb_id": data.tmdb_id,
+        "media_type": data.media_type,
+        "progress": data.progress,
+        "duration": data.duration,
+        "title": data.title or "",
+        "backdrop_path": data.backdrop_path or "",
+        "poster_path": data.poster_path or "",
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if data.season is not None:
+        doc["season"] = data.season
+    if data.episode is not None:
+        doc["episode"] = data.episode
+    return doc
+
+def watch_progress_save_op(user_id: str, doc: dict) -> UpdateOne:
+    """Upsert of a continue-watching entry that keeps its original created_at"""
+    return UpdateOne(
+        title_state_key(user_id, doc["tmdb_id"], doc["media_type"]),
+        [{"$set": {
+            "progress": {"$mergeObjects": [
+                {"created_at": doc["updated_at"]},
+                {"$ifNull": ["$progress", {}]},
+                doc
+            ]},
+            "progress_updated_at": doc["updated_at"]
+        }}],
+        upsert=True
+    )
+
+def watch_progress_clear_op(user_id: str, tmdb_id: int) -> UpdateMany:
+    return UpdateMany(
+        {"user_id": user_id, "media_id": tmdb_id, "progress": {"$exists": True}},
+        {"$unset": {"progress": "", "progress_updated_at": ""}}
+    )
+
+# Progress heartbeats are write-behind: only the latest position per (user, title)
+# is kept in memory and flushed with bulk_write; reads overlay the pending values.
+# The buffer is per process, so read-your-writes holds only for requests served by
+# the worker that took the write; other workers see it after the next flush.
+WATCH_PROGRESS_FLUSH_INTERVAL_SECONDS = float(os.environ.get("WATCH_PROGRESS_FLUSH_INTERVAL_SECONDS", "5"))
+
+class WatchProgressBuffer:
+    """Latest pending save/clear per (user_id, tmdb_id), flushed in one bulk_write"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._pending = {}   # user_id -> {tmdb_id: ("save", doc) | ("clear", None)}
+        self._flushing = {}  # snapshot being written, still visible to reads
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # held for a whole flush, including the write
+        self._discarded = TTLCache(300, max_size=10000)  # deleted accounts: late writes are dropped
+        self.received = 0
+        self.written = 0
+
+    def _put(self, user_id: str, tmdb_id: int, entry: tuple):
+        if self._discarded.get(user_id):
+            return
+        with self._lock:
+            self._pending.setdefault(user_id, {})[tmdb_id] = entry
+            self.received += 1
+
+    def save(self, user_id: str, doc: dict):
+        self._put(user_id, doc["tmdb_id"], ("save", doc))
+
+    def clear(self, user_id: str, tmdb_id: int):
+        self._put(user_id, tmdb_id, ("clear", None))
+
+    def discard_user(self, user_id: str):
+        """Drop a deleted user's pending writes; returns once no flush can still write them"""
+        self._discarded.set(user_id, True)
+        with self._flush_lock:
+            with self._lock:
+                self._pending.pop(user_id, None)
+                self._flushing.pop(user_id, None)
+
+    def pending_for_user(self, user_id: str) -> dict:
+        """tmdb_id -> (kind, doc) not yet visible in the database"""
+        with self._lock:
+            entries = dict(self._flushing.get(user_id, {}))
+            entries.update(self._pending.get(user_id, {}))
+            return entries
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._flushing = batch
+        operations = []
+        for user_id, titles in batch.items():
+            for tmdb_id, (kind, doc) in titles.items():
+                if kind == "save":
+                    operations.append(watch_progress_save_op(user_id, doc))
+                else:
+                    operations.append(watch_progress_clear_op(user_id, tmdb_id))
+        try:
+            if operations:
+                self.collection.bulk_write(operations, ordered=False)
+                self.written += len(operations)
+        except Exception as e:
+            logger.error(f"Watch progress flush failed, requeueing {len(operations)} entries: {e}")
+            with self._lock:
+                for user_id, titles in batch.items():
+                    pending = self._pending.setdefault(user_id, {})
+                    for tmdb_id, entry in titles.items():
+                        pending.setdefault(tmdb_id, entry)
+        finally:
+            with self._lock:
+                self._flushing = {}
+        return len(operations)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = sum(len(titles) for titles in self._pending.values())
+        return {
+            "pending": pending,
+            "received": self.received,
+            "written": self.written,
+            "coalesced": max(self.received - self.written - pending, 0)
+        }
+
+watch_progress_buffer = WatchProgressBuffer(user_title_state)
+register_periodic_job(watch_progress_buffer.flush, WATCH_PROGRESS_FLUSH_INTERVAL_SECONDS)
+
+def find_watch_progress(user_id: str, tmdb_id: int) -> Optional[dict]:
+    pending = watch_progress_buffer.pending_for_user(user_id).get(tmdb_id)
+    if pending and pending[0] == "clear":
+        return None
+    state = user_title_state.find_one(
+        {"user_id": user_id, "media_id": tmdb_id, "progress": {"$exists": True}},
+        {"_id": 0, "progress": 1}
+    )
+    stored = state["progress"] if state else None
+    if pending:
+        return dict(stored or {"created_at": pending[1]["updated_at"]}, **pending[1])
+    return stored
+
+def list_watch_progress(user_id: str, limit: int = 20) -> List[dict]:
+    pending = watch_progress_buffer.pending_for_user(user_id)
+    states = user_title_state.find(
+        {"user_id": user_id, "progress_updated_at": {"$exists": True}},
+        {"_id": 0, "progress": 1}
+    ).sort("progress_updated_at", DESCENDING).limit(limit + len(pending))
+    items = {state["progress"]["tmdb_id"]: state["progress"] for state in states}
+    for tmdb_id, (kind, doc) in pending.items():
+        if kind == "clear":
+            items.pop(tmdb_id, None)
+        else:
+            items[tmdb_id] = dict(items.get(tmdb_id) or {"created_at": doc["updated_at"]}, **doc)
+    return sorted(items.values(), key=lambda item: item.get("updated_at") or "", reverse=True)[:limit]
+
+def overlay_pending_progress(user_id: str, states: dict) -> dict:
+    """Apply buffered progress to {(media_type, media_id): state} read from the database"""
+    for tmdb_id, (kind, doc) in watch_progress_buffer.pending_for_user(user_id).items():
+        if kind == "clear":
+            for media_type in ("movie", "tv"):
+                if states.get((media_type, tmdb_id)):
+                    states[(media_type, tmdb_id)].pop("progress", None)
+        else:
+            state = states.setdefault((doc["media_type"], tmdb_id), {})
+            state["progress"] = dict(state.get("progress") or {"created_at": doc["updated_at"]}, **doc)
+    return states
+
+def public_title_state(state: Optional[dict], media_type: str, media_id: int) -> dict:
+    state = state or {}
+    return {
+        "media_type": media_type,
+        "media_id": media_id,
+        "in_list": bool(state.get("in_list")),
+        "liked": bool(state.get("liked")),
+        "rating": state.get("rating") or 0,
+        "progress": state.get("progress")
+    }
+
 # =====================
 # USER LIST ENDPOINTS
 # =====================
@@ -2541,53 +4983,66 @@ async def search_contents(q: str, page: int = 1, limit: int = 20, verify_vixsrc:
 @app.post("/api/user/list/add")
 def add_to_list(item: ListItem):
     """Add item to user's list"""
-    existing = user_lists.find_one({
-        "user_id": item.user_id,
-        "media_id": item.media_id,
-        "media_type": item.media_type
-    }, {"_id": 0})
-    
-    if existing:
+    key = title_state_key(item.user_id, item.media_id, item.media_type)
+    try:
+        # Matches only when not yet in the list; otherwise the upsert hits the unique key
+        user_title_state.update_one(
+            dict(key, in_list={"$ne": True}),
+            {"$set": {
+                "in_list": True,
+                "title": item.title,
+                "poster_path": item.poster_path,
+                "backdrop_path": item.backdrop_path,
+                "list_added_at": datetime.now(timezone.utc).isoformat()
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
         return {"success": True, "in_list": True, "message": "Already in list"}
     
-    user_lists.insert_one({
-        "user_id": item.user_id,
-        "media_id": item.media_id,
-        "media_type": item.media_type,
-        "title": item.title,
-        "poster_path": item.poster_path,
-        "backdrop_path": item.backdrop_path,
-        "added_at": datetime.now(timezone.utc).isoformat()
-    })
-    
     return {"success": True, "in_list": True, "message": "Added to list"}
 
 @app.post("/api/user/list/remove")
 def remove_from_list(item: ListItem):
     """Remove item from user's list"""
-    result = user_lists.delete_one({
-        "user_id": item.user_id,
-        "media_id": item.media_id,
-        "media_type": item.media_type
-    })
+    key = title_state_key(item.user_id, item.media_id, item.media_type)
+    result = user_title_state.update_one(
+        dict(key, in_list=True),
+        {
+            "$set": {"in_list": False},
+            "$unset": {"list_added_at": "", "title": "", "poster_path": "", "backdrop_path": ""}
+        }
+    )
     
-    return {"success": True, "in_list": False, "deleted": result.deleted_count > 0}
+    return {"success": True, "in_list": False, "deleted": result.modified_count > 0}
 
 @app.get("/api/user/list/check/{user_id}/{media_type}/{media_id}")
 def check_in_list(user_id: str, media_type: str, media_id: int):
     """Check if item is in user's list"""
-    existing = user_lists.find_one({
-        "user_id": user_id,
-        "media_id": media_id,
-        "media_type": media_type
-    }, {"_id": 0})
+    existing = user_title_state.find_one(
+        dict(title_state_key(user_id, media_id, media_type), in_list=True),
+        USER_TITLE_EXISTS_PROJECTION
+    )
     
     return {"in_list": existing is not None}
 
+def list_items_for_user(user_id: str, limit: int = 0) -> List[dict]:
+    """User's list in the shape the list endpoints have always returned"""
+    states = user_title_state.find(
+        {"user_id": user_id, "in_list": True},
+        {"_id": 0, "user_id": 1, "media_id": 1, "media_type": 1, "title": 1,
+         "poster_path": 1, "backdrop_path": 1, "list_added_at": 1}
+    ).sort("list_added_at", DESCENDING).limit(limit)
+    items = []
+    for state in states:
+        state["added_at"] = state.pop("list_added_at", None)
+        items.append(state)
+    return items
+
 @app.get("/api/user/list/{user_id}")
 def get_user_list(user_id: str):
     """Get all items in user's list"""
-    items = list(user_lists.find({"user_id": user_id}, {"_id": 0}))
+    items = list_items_for_user(user_id)
     return {"items": items, "count": len(items)}
 
 # =====================
@@ -2600,16 +5055,12 @@ def set_rating(item: RatingItem):
     if item.rating < 1 or item.rating > 5:
         raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
     
-    user_ratings.update_one(
-        {
-            "user_id": item.user_id,
-            "media_id": item.media_id,
-            "media_type": item.media_type
-        },
+    user_title_state.update_one(
+        title_state_key(item.user_id, item.media_id, item.media_type),
         {
             "$set": {
                 "rating": item.rating,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "rating_updated_at": datetime.now(timezone.utc).isoformat()
             }
         },
         upsert=True
@@ -2620,13 +5071,12 @@ def set_rating(item: RatingItem):
 @app.get("/api/user/rating/{user_id}/{media_type}/{media_id}")
 def get_rating(user_id: str, media_type: str, media_id: int):
     """Get user rating for a media item"""
-    rating = user_ratings.find_one({
-        "user_id": user_id,
-        "media_id": media_id,
-        "media_type": media_type
-    }, {"_id": 0})
+    rating = user_title_state.find_one(
+        title_state_key(user_id, media_id, media_type),
+        {"_id": 0, "rating": 1}
+    )
     
-    return {"rating": rating.get("rating") if rating else 0}
+    return {"rating": (rating or {}).get("rating") or 0}
 
 # =====================
 # USER LIKE ENDPOINTS
@@ -2635,255 +5085,336 @@ def get_rating(user_id: str, media_type: str, media_id: int):
 @app.post("/api/user/like/toggle")
 def toggle_like(item: LikeItem):
     """Toggle like status for an item"""
-    existing = user_likes.find_one({
-        "user_id": item.user_id,
-        "media_id": item.media_id,
-        "media_type": item.media_type
-    }, {"_id": 0})
+    was_liked = {"$eq": ["$liked", True]}
+    state = user_title_state.find_one_and_update(
+        title_state_key(item.user_id, item.media_id, item.media_type),
+        [{"$set": {
+            "liked": {"$not": [was_liked]},
+            "liked_at": {"$cond": [was_liked, "$$REMOVE", datetime.now(timezone.utc).isoformat()]}
+        }}],
+        projection={"_id": 0, "liked": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
     
-    if existing:
-        user_likes.delete_one({
-            "user_id": item.user_id,
-            "media_id": item.media_id,
-            "media_type": item.media_type
-        })
+    if not state.get("liked"):
         return {"success": True, "liked": False, "message": "Like removed"}
-    
-    user_likes.insert_one({
-        "user_id": item.user_id,
-        "media_id": item.media_id,
-        "media_type": item.media_type,
-        "liked_at": datetime.now(timezone.utc).isoformat()
-    })
-    
     return {"success": True, "liked": True, "message": "Liked"}
 
 @app.get("/api/user/like/check/{user_id}/{media_type}/{media_id}")
 def check_like(user_id: str, media_type: str, media_id: int):
     """Check if item is liked by user"""
-    existing = user_likes.find_one({
-        "user_id": user_id,
-        "media_id": media_id,
-        "media_type": media_type
-    }, {"_id": 0})
+    existing = user_title_state.find_one(
+        dict(title_state_key(user_id, media_id, media_type), liked=True),
+        USER_TITLE_EXISTS_PROJECTION
+    )
     
     return {"liked": existing is not None}
 
 @app.get("/api/user/likes/{user_id}")
 def get_user_likes(user_id: str):
     """Get all liked items for user"""
-    items = list(user_likes.find({"user_id": user_id}, {"_id": 0}))
+    items = list(user_title_state.find(
+        {"user_id": user_id, "liked": True},
+        {"_id": 0, "user_id": 1, "media_id": 1, "media_type": 1, "liked_at": 1}
+    ))
     return {"items": items, "count": len(items)}
 
+# =====================
+# USER TITLE STATE (batch)
+# =====================
+
+MAX_USER_STATE_BATCH = 100
+
+class TitleRef(BaseModel):
+    media_type: Literal["movie", "tv"]
+    media_id: int
+
+class UserStateBatchRequest(BaseModel):
+    items: List[TitleRef]
+
+@app.post("/api/user/state/batch")
+def get_user_state_batch(data: UserStateBatchRequest, user = Depends(get_current_user)):
+    """
+    List, like, rating and watch-progress state for many titles at once
+    (one $in query, e.g. for a whole carousel row)
+    """
+    if len(data.items) > MAX_USER_STATE_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_USER_STATE_BATCH} items per request")
+    
+    media_ids = sorted({item.media_id for item in data.items})
+    states = {
+        (state["media_type"], state["media_id"]): state
+        for state in user_title_state.find(
+            {"user_id": user["id"], "media_id": {"$in": media_ids}},
+            {"_id": 0}
+        )
+    }
+    overlay_pending_progress(user["id"], states)
+    
+    items = [
+        public_title_state(states.get((item.media_type, item.media_id)), item.media_type, item.media_id)
+        for item in data.items
+    ]
+    return {"items": items}
+
+@app.get("/api/user/state/{media_type}/{media_id}")
+def get_user_title_state(media_type: str, media_id: int, user = Depends(get_current_user)):
+    """All per-title state for a detail page in one indexed read"""
+    state = user_title_state.find_one(
+        title_state_key(user["id"], media_id, media_type),
+        {"_id": 0}
+    )
+    states = overlay_pending_progress(user["id"], {(media_type, media_id): state or {}})
+    return public_title_state(states.get((media_type, media_id)), media_type, media_id)
+
 # =====================
 # CONTENT VIEWS TRACKING (for automatic Top 10)
 # =====================
 
 @app.post("/api/content/view/{media_type}/{tmdb_id}")
-async def track_content_view(media_type: str, tmdb_id: int):
+async def track_content_view(
+    media_type: str,
+    request: Request,
+    tmdb_id: int = Path(gt=0, le=MAX_TMDB_ID),
+    viewer_id: Optional[str] = Query(None, min_length=1, max_length=VIEWER_ID_MAX_LENGTH)
+):
     """Track a view for content - used to calculate Top 10"""
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    
-    # Increment view count for today
-    content_views.update_one(
-        {"tmdbId": tmdb_id, "type": media_type, "date": today},
-        {
-            "$inc": {"views": 1},
-            "$setOnInsert": {"createdAt": datetime.now(timezone.utc).isoformat()}
-        },
-        upsert=True
-    )
+    validate_view_media_type(media_type)
+    view_ingestor.add(tmdb_id, media_type, viewer=viewer_fingerprint(request, viewer_id))
     return {"success": True}
 
 # =====================
 # PUBLIC TOP 10 (Automatic based on views)
 # =====================
 
-@app.get("/api/public/top10")
-async def get_public_top10():
-    """Get Top 10 contents based on views from the last 7 days"""
-    # Get date range for last 7 days
-    today = datetime.now(timezone.utc)
-    week_ago = today - timedelta(days=7)
-    
-    # Aggregate views per content
+# The ranked, enriched Top 10 is precomputed by a periodic compaction job over the
+# per-day content_views documents and stored as one snapshot document
+TOP10_WINDOW_DAYS = 7
+TOP10_ROLLUP_INTERVAL_SECONDS = float(os.environ.get("TOP10_ROLLUP_INTERVAL_SECONDS", "300"))
+top10_snapshots = db["top10_snapshots"]
+content_views.create_index([("date", ASCENDING), ("type", ASCENDING), ("tmdbId", ASCENDING)])
+
+VIEW_WINDOWS = {"day": 1, "week": 7, "month": 30}
+
+def migrate_content_views_to_timeseries() -> dict:
+    """Copy the retained per-day counters into the time-series store, one measurement per title-day"""
+    match = {}
+    if VIEW_RETENTION_DAYS > 0:
+        match["date"] = {"$gte": (datetime.now(timezone.utc) - timedelta(days=VIEW_RETENTION_DAYS)).strftime("%Y-%m-%d")}
     pipeline = [
-        {
-            "$match": {
-                "date": {"$gte": week_ago.strftime("%Y-%m-%d")}
-            }
-        },
-        {
-            "$group": {
-                "_id": {"tmdbId": "$tmdbId", "type": "$type"},
-                "totalViews": {"$sum": "$views"}
-            }
-        },
-        {"$sort": {"totalViews": -1}},
-        {"$limit": 10}
+        {"$match": match},
+        {"$group": {
+            "_id": {"tmdbId": "$tmdbId", "type": "$type", "date": "$date"},
+            "views": {"$sum": "$views"}
+        }}
     ]
+    batch = []
+    copied = 0
+    for row in content_views.aggregate(pipeline):
+        key = row["_id"]
+        batch.append({
+            "ts": view_day_start(key["date"]),
+            "meta": {"type": key["type"], "tmdbId": key["tmdbId"]},
+            "views": row["views"]
+        })
+        if len(batch) >= 1000:
+            content_view_events.insert_many(batch, ordered=False)
+            copied += len(batch)
+            batch = []
+    if batch:
+        content_view_events.insert_many(batch, ordered=False)
+        copied += len(batch)
+    return {"copied": copied}
+
+if VIEW_STORE == "timeseries":
+    run_migration_once("content_views_timeseries_v1", migrate_content_views_to_timeseries)
+
+def rank_top_viewed(window_days: int, limit: int) -> List[dict]:
+    """Titles with the most views over the last window_days days, as [{tmdbId, type, views}]"""
+    since = view_window_start(window_days)
+    if VIEW_STORE == "timeseries":
+        collection = content_view_events
+        match = {"ts": {"$gte": since}}
+        group_id = {"tmdbId": "$meta.tmdbId", "type": "$meta.type"}
+    else:
+        collection = content_views
+        match = {"date": {"$gte": since.strftime("%Y-%m-%d")}}
+        group_id = {"tmdbId": "$tmdbId", "type": "$type"}
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": group_id, "views": {"$sum": "$views"}}},
+        {"$sort": {"views": -1}},
+        {"$limit": limit}
+    ]
+    return [
+        {"tmdbId": row["_id"]["tmdbId"], "type": row["_id"]["type"], "views": row["views"]}
+        for row in collection.aggregate(pipeline)
+    ]
+
+@app.get("/api/admin/views/top")
+def get_top_viewed(
+    window: Literal["day", "week", "month"] = "week",
+    limit: int = Query(20, ge=1, le=100),
+    admin = Depends(get_current_admin)
+):
+    """Most viewed titles over the last 1, 7 or 30 UTC calendar days, today included"""
+    return {
+        "window": window,
+        "store": VIEW_STORE,
+        "items": rank_top_viewed(VIEW_WINDOWS[window], limit)
+    }
+
+TOP10_RANKINGS = ("views", "unique")
+TOP10_UNIQUE_CANDIDATES = int(os.environ.get("TOP10_UNIQUE_CANDIDATES", "200"))
+
+def rank_top_unique(window_days: int, limit: int) -> List[dict]:
+    """Titles with the most unique viewers over the window, from merged daily sketches"""
+    since = view_window_start(window_days).strftime("%Y-%m-%d")
+    # Unique viewers never exceed views, so candidates come from the views ranking and
+    # the scan stops once no remaining title can reach the current top `limit`
+    candidates = rank_top_viewed(window_days, TOP10_UNIQUE_CANDIDATES)
+    sketches = {}
+    cursor = content_view_sketches.find(
+        {"date": {"$gte": since}, "tmdbId": {"$in": [c["tmdbId"] for c in candidates]}},
+        {"_id": 0, "type": 1, "tmdbId": 1, "registers": 1}
+    )
+    for doc in cursor:
+        sketches.setdefault((doc["type"], doc["tmdbId"]), []).append(doc["registers"])
     
-    top_viewed = list(content_views.aggregate(pipeline))
-    
-    # If we have views data, use it
-    if top_viewed:
-        items = []
-        position = 1
-        for item in top_viewed:
-            tmdb_id = item["_id"]["tmdbId"]
-            media_type = item["_id"]["type"]
-            
-            # Try to get from local DB first
-            content = contents.find_one({"tmdbId": tmdb_id}, {"_id": 0})
-            if content:
-                items.append({
-                    "position": position,
-                    "tmdbId": tmdb_id,
-                    "type": media_type,
-                    "title": content.get("title") or content.get("name"),
-                    "poster_path": content.get("poster_path"),
-                    "backdrop_path": content.get("backdrop_path"),
-                    "views": item["totalViews"]
-                })
-                position += 1
-            else:
-                # Fetch from TMDB
-                tmdb_data = await fetch_tmdb_data(f"/{media_type}/{tmdb_id}")
-                if tmdb_data:
-                    items.append({
-                        "position": position,
-                        "tmdbId": tmdb_id,
-                        "type": media_type,
-                        "title": tmdb_data.get("title") or tmdb_data.get("name"),
-                        "poster_path": tmdb_data.get("poster_path"),
-                        "backdrop_path": tmdb_data.get("backdrop_path"),
-                        "views": item["totalViews"]
-                    })
-                    position += 1
-        
-        if items:
-            return {"enabled": True, "items": items}
+    ranked = []
+    for candidate in candidates:
+        if len(ranked) >= limit and ranked[limit - 1]["uniqueViewers"] >= candidate["views"]:
+            break
+        daily = sketches.get((candidate["type"], candidate["tmdbId"]))
+        if not daily:
+            continue
+        registers = bytearray(daily[0])
+        for other in daily[1:]:
+            hll_merge(registers, other)
+        ranked.append({**candidate, "uniqueViewers": hll_estimate(registers)})
+        ranked.sort(key=lambda r: r["uniqueViewers"], reverse=True)
+    return ranked[:limit]
+
+def top10_item(tmdb_id: int, media_type: str, source: dict, views: int) -> dict:
+    """Top 10 entry from a local content document or a TMDB payload"""
+    genre_ids = source.get("genre_ids")
+    if genre_ids is None:
+        genre_ids = [g["id"] for g in source.get("genres", [])]
+    return {
+        "tmdbId": tmdb_id,
+        "type": media_type,
+        "title": source.get("title") or source.get("name"),
+        "overview": source.get("overview", ""),
+        "poster_path": source.get("poster_path"),
+        "backdrop_path": source.get("backdrop_path"),
+        "release_date": source.get("release_date") or source.get("first_air_date"),
+        "vote_average": source.get("vote_average", 0),
+        "genre_ids": genre_ids,
+        "views": views
+    }
+
+async def enrich_ranked_titles(ranked: List[dict], limit: int) -> List[dict]:
+    """Attach display metadata to ranked titles: one $in on contents, then TMDB concurrently"""
+    local = {
+        doc["tmdbId"]: doc
+        for doc in contents.find({"tmdbId": {"$in": [r["tmdbId"] for r in ranked]}}, {"_id": 0})
+    }
     
-    # Fallback: Use TMDB trending if no views data
-    data = await fetch_tmdb_data("/trending/all/day")
-    if not data or "results" not in data:
-        return {"enabled": True, "items": []}
+    async def source_for(record: dict) -> Optional[dict]:
+        doc = local.get(record["tmdbId"])
+        if doc and doc.get("type", record["type"]) == record["type"]:
+            return doc
+        try:
+            return await fetch_tmdb_details(record["type"], record["tmdbId"])
+        except Exception as e:
+            logger.error(f"Top 10 enrichment failed for {record['type']} {record['tmdbId']}: {e}")
+            return None
     
+    sources = await asyncio.gather(*(source_for(record) for record in ranked))
     items = []
-    position = 1
-    for item in data["results"][:10]:
-        if is_anime_content(item):
-            continue
-        media_type = item.get("media_type", "movie")
-        if media_type not in ["movie", "tv"]:
+    for record, source in zip(ranked, sources):
+        if not source:
             continue
-        items.append({
-            "position": position,
-            "tmdbId": item.get("id"),
-            "type": media_type,
-            "title": item.get("title") or item.get("name"),
-            "poster_path": item.get("poster_path"),
-            "backdrop_path": item.get("backdrop_path"),
-            "views": 0
-        })
-        position += 1
-        if position > 10:
+        item = top10_item(record["tmdbId"], record["type"], source, record["views"])
+        if "uniqueViewers" in record:
+            item["uniqueViewers"] = record["uniqueViewers"]
+        items.append(item)
+        if len(items) >= limit:
             break
-    
-    return {"enabled": True, "items": items}
+    return items
 
-@app.get("/api/public/sections")
-def get_public_sections():
-    """Get all active sections for homepage"""
-    items = list(sections.find({"active": True}, {"_id": 0}).sort("order", 1))
-    return {"items": items}
+def ranking_key(ranked: List[dict]) -> List[str]:
+    return [f"{record['type']}:{record['tmdbId']}" for record in ranked]
 
-@app.get("/api/public/homepage/trending")
-async def get_homepage_trending(page: int = 1):
-    """Get trending content for 'I titoli del momento' section"""
-    data = await fetch_tmdb_data("/trending/all/week", {"page": page})
-    if not data or "results" not in data:
-        return {"items": [], "total": 0}
-    
-    items = []
-    for item in data["results"]:
-        if is_anime_content(item):
-            continue
-        tmdb_id = item.get("id")
-        item_type = item.get("media_type", "movie")
-        items.append({
-            "id": tmdb_id,
-            "tmdbId": tmdb_id,
-            "type": item_type,
-            "media_type": item_type,
-            "title": item.get("title") or item.get("name"),
-            "name": item.get("title") or item.get("name"),
-            "poster_path": item.get("poster_path"),
-            "backdrop_path": item.get("backdrop_path"),
-            "release_date": item.get("release_date") or item.get("first_air_date"),
-            "vote_average": item.get("vote_average", 0),
-            "popularity": item.get("popularity", 0),
-            "genre_ids": item.get("genre_ids", []),
-            "overview": item.get("overview")
-        })
-    
-    return {"items": items, "total": len(items), "page": page}
+def top10_snapshot_id(rank_by: str) -> str:
+    return f"{TOP10_WINDOW_DAYS}d" if rank_by == "views" else f"{TOP10_WINDOW_DAYS}d:{rank_by}"
 
-@app.get("/api/public/homepage/latest")
-async def get_homepage_latest(page: int = 1):
-    """Get latest added content for 'Aggiunti di recente' section"""
-    # Get from now_playing movies and on_the_air TV
-    movies = await fetch_tmdb_data("/movie/now_playing", {"page": page})
-    tv = await fetch_tmdb_data("/tv/on_the_air", {"page": page})
-    
-    items = []
-    
-    if movies and "results" in movies:
-        for item in movies["results"][:10]:
-            if is_anime_content(item):
-                continue
-            tmdb_id = item.get("id")
-            items.append({
-                "id": tmdb_id,
-                "tmdbId": tmdb_id,
-                "type": "movie",
-                "media_type": "movie",
-                "title": item.get("title"),
-                "name": item.get("title"),
-                "poster_path": item.get("poster_path"),
-                "backdrop_path": item.get("backdrop_path"),
-                "release_date": item.get("release_date"),
-                "vote_average": item.get("vote_average", 0),
-                "popularity": item.get("popularity", 0),
-                "genre_ids": item.get("genre_ids", []),
-                "overview": item.get("overview")
-            })
-    
-    if tv and "results" in tv:
-        for item in tv["results"][:10]:
-            if is_anime_content(item):
+async def compute_top10_snapshot(rank_by: str = "views") -> dict:
+    """Rank, enrich and store the Top 10; padded with TMDB trending when views are scarce"""
+    if rank_by == "unique":
+        ranked = await asyncio.to_thread(rank_top_unique, TOP10_WINDOW_DAYS, 20)
+    else:
+        ranked = rank_top_viewed(TOP10_WINDOW_DAYS, 20)  # extra rows absorb TMDB lookup failures
+    key = ranking_key(ranked)
+    
+    # Same titles in the same order: keep the enriched items and only refresh the counts.
+    # A snapshot padded with trending titles is rebuilt every time, so the padding stays current
+    previous = top10_snapshots.find_one({"_id": top10_snapshot_id(rank_by)})
+    if previous and previous.get("rankingKey") == key and previous.get("padded") is False:
+        counts = {(record["type"], record["tmdbId"]): record for record in ranked}
+        for item in previous["items"]:
+            record = counts.get((item["type"], item["tmdbId"]))
+            if record:
+                item["views"] = record["views"]
+                if "uniqueViewers" in record:
+                    item["uniqueViewers"] = record["uniqueViewers"]
+        previous["computedAt"] = datetime.now(timezone.utc).isoformat()
+        top10_snapshots.replace_one({"_id": previous["_id"]}, previous)
+        return previous
+    
+    items = await enrich_ranked_titles(ranked, 10)
+    padded = len(items) < 10
+    
+    if padded:
+        trending_data = await fetch_tmdb_data("/trending/all/day")
+        existing_ids = {item["tmdbId"] for item in items}
+        for item in (trending_data or {}).get("results", []):
+            media_type = item.get("media_type", "movie")
+            if media_type not in ["movie", "tv"] or item.get("id") in existing_ids or is_anime_content(item):
                 continue
-            tmdb_id = item.get("id")
-            items.append({
-                "id": tmdb_id,
-                "tmdbId": tmdb_id,
-                "type": "tv",
-                "media_type": "tv",
-                "title": item.get("name"),
-                "name": item.get("name"),
-                "poster_path": item.get("poster_path"),
-                "backdrop_path": item.get("backdrop_path"),
-                "release_date": item.get("first_air_date"),
-                "vote_average": item.get("vote_average", 0),
-                "popularity": item.get("popularity", 0),
-                "genre_ids": item.get("genre_ids", []),
-                "overview": item.get("overview")
-            })
+            items.append(top10_item(item.get("id"), media_type, item, 0))
+            existing_ids.add(item.get("id"))
+            if len(items) >= 10:
+                break
     
-    # Sort by release date descending
-    items.sort(key=lambda x: x.get("release_date", "") or "", reverse=True)
+    for position, item in enumerate(items, start=1):
+        item["position"] = position
     
-    return {"items": items[:20], "total": len(items), "page": page}
+    snapshot = {
+        "_id": top10_snapshot_id(rank_by),
+        "rankBy": rank_by,
+        "rankingKey": key,
+        "padded": padded,
+        "items": items,
+        "computedAt": datetime.now(timezone.utc).isoformat()
+    }
+    top10_snapshots.replace_one({"_id": snapshot["_id"]}, snapshot, upsert=True)
+    return snapshot
+
+async def refresh_top10_snapshots():
+    for rank_by in TOP10_RANKINGS:
+        await compute_top10_snapshot(rank_by)
+
+register_periodic_job(refresh_top10_snapshots, TOP10_ROLLUP_INTERVAL_SECONDS, flush_on_shutdown=False)
+
+@app.get("/api/public/top10")
+async def get_public_top10(rank_by: Literal["views", "unique"] = "views"):
+    """Get Top 10 contents from the last 7 days by views or unique viewers (precomputed snapshot)"""
+    snapshot = top10_snapshots.find_one({"_id": top10_snapshot_id(rank_by)})
+    if not snapshot:
+        snapshot = await compute_top10_snapshot(rank_by)
+    return {"enabled": True, "rankBy": rank_by, "items": snapshot["items"]}
 
 @app.get("/api/public/homepage/genre/{genre_id}")
 async def get_homepage_genre(genre_id: int, media_type: str = "movie", page: int = 1):
@@ -0,0 +1,31 @@
+"""Load backend/server.py against an in-memory mongomock database."""
+import sys
+from pathlib import Path
+
+import mongomock
+import pymongo
+import pytest
+from mongomock.database import Database
+from pymongo.errors import OperationFailure
+
+_create_collection = Database.create_collection
+
+
+def _create_plain_collection(self, name, **options):
+    # mongomock can't create time-series/capped collections: behave like a server
+    # without support, so the server falls back to its plain-collection code paths
+    if options:
+        raise OperationFailure(f"unsupported collection options: {sorted(options)}")
+    return _create_collection(self, name)
+
+
+Database.create_collection = _create_plain_collection
+Database.command = lambda self, *args, **kwargs: {"ok": 1}
+pymongo.MongoClient = mongomock.MongoClient
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+@pytest.fixture(scope="session")
+def server():
+    import server as module
+    return module
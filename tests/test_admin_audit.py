@@ -0,0 +1,56 @@
+from pymongo.errors import AutoReconnect
+
+
+def entries(count):
+    return [{"action": "UPDATE", "contentId": str(i), "metadata": {}} for i in range(count)]
+
+
+def test_failed_batch_is_requeued_and_written_later(server, monkeypatch):
+    collection = server.db["test_admin_logs_requeue"]
+    writer = server.AdminAuditWriter(collection, batch_size=1000)
+    for entry in entries(3):
+        writer.add(entry)
+
+    insert_many = collection.insert_many
+
+    def unreachable(documents, ordered=True):
+        raise AutoReconnect("primary stepped down")
+
+    monkeypatch.setattr(collection, "insert_many", unreachable)
+    writer.flush()
+    assert writer.stats()["pending"] == 3
+
+    monkeypatch.setattr(collection, "insert_many", insert_many)
+    writer.flush()
+    assert collection.count_documents({}) == 3
+    assert writer.stats() == {"pending": 0, "written": 3, "requeued": 3, "dropped": 0}
+
+
+def test_only_entries_that_did_not_insert_are_requeued(server):
+    collection = server.db["test_admin_logs_partial"]
+    writer = server.AdminAuditWriter(collection, batch_size=1000)
+    batch = entries(3)
+    collection.insert_one(batch[1])  # landed on an earlier, seemingly failed attempt
+    for entry in batch:
+        writer.add(entry)
+
+    writer.flush()
+
+    assert collection.count_documents({}) == 3
+    assert writer.stats()["pending"] == 0
+
+
+def test_buffer_is_bounded_while_the_database_is_down(server, monkeypatch):
+    collection = server.db["test_admin_logs_bounded"]
+    writer = server.AdminAuditWriter(collection, batch_size=1000, max_pending=5)
+
+    def unreachable(documents, ordered=True):
+        raise AutoReconnect("no primary")
+
+    monkeypatch.setattr(collection, "insert_many", unreachable)
+    for entry in entries(8):
+        writer.add(entry)
+    writer.flush()
+
+    assert writer.stats()["pending"] == 5
+    assert writer.stats()["dropped"] == 3
@@ -0,0 +1,29 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(server):
+    return TestClient(server.app)
+
+
+def test_successful_logins_do_not_use_up_the_account_budget(server, client):
+    credentials = {"email": "regular@example.com", "password": "correct horse"}
+    assert client.post("/api/auth/register", json={**credentials, "name": "Regular"}).status_code == 200
+
+    for _ in range(int(server.AUTH_ACCOUNT_BURST) + 3):
+        assert client.post("/api/auth/login", json=credentials).status_code == 200
+
+
+def test_failed_logins_only_lock_out_the_ip_that_made_them(server, client, monkeypatch):
+    monkeypatch.setattr(server, "TRUST_PROXY_HEADERS", True)
+    attacker = {"X-Forwarded-For": "198.51.100.9"}
+    credentials = {"email": "victim@example.com", "password": "correct horse"}
+    assert client.post("/api/auth/register", json={**credentials, "name": "Victim"}).status_code == 200
+
+    wrong = {**credentials, "password": "guess"}
+    statuses = [client.post("/api/auth/login", json=wrong, headers=attacker).status_code for _ in range(int(server.AUTH_ACCOUNT_BURST) + 1)]
+    assert statuses[-1] == 429
+
+    owner = {"X-Forwarded-For": "203.0.113.7"}
+    assert client.post("/api/auth/login", json=credentials, headers=owner).status_code == 200
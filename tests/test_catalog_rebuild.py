@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+
+@pytest.fixture
+def catalog(server):
+    """Snapshot the live catalog (a swap replaces it whole) and restore it afterwards"""
+    names = ("contents", "tv_seasons", "tv_episodes")
+    saved = {name: list(server.db[name].find({})) for name in names}
+    yield
+    server.catalog_rebuild_state.delete_many({})
+    for name in names:
+        server.db[f"{name}{server.SHADOW_SUFFIX}"].drop()
+        server.db[name].drop()
+        if saved[name]:
+            server.db[name].insert_many(saved[name])
+
+
+def mark(server, state, heartbeat_age=0):
+    server.catalog_rebuild_state.insert_one({
+        "_id": server.CATALOG_REBUILD_MARKER,
+        "state": state,
+        "startedAt": datetime.now(timezone.utc).isoformat(),
+        "heartbeatAt": datetime.now(timezone.utc) - timedelta(seconds=heartbeat_age)
+    })
+
+
+def fill_shadows(server, tmdb_id):
+    server.db["contents__shadow"].insert_one({"tmdbId": tmdb_id, "type": "tv", "title": "New"})
+    server.db["tv_seasons__shadow"].insert_one({"tmdbId": tmdb_id, "seasonNumber": 1})
+    server.db["tv_episodes__shadow"].insert_one({"tmdbId": tmdb_id, "seasonNumber": 1, "episodeNumber": 1})
+
+
+def test_recovery_finishes_an_interrupted_swap(server, catalog):
+    server.contents.insert_one({"tmdbId": 4301, "type": "tv", "title": "Old"})
+    fill_shadows(server, 4301)
+    # Crash after the first rename: tv_seasons is already live
+    server.db["tv_seasons__shadow"].rename("tv_seasons", dropTarget=True)
+    mark(server, "swapping")
+
+    server.recover_catalog_swap()
+
+    names = server.db.list_collection_names()
+    assert not [name for name in names if name.endswith(server.SHADOW_SUFFIX)]
+    assert server.contents.find_one({"tmdbId": 4301})["title"] == "New"
+    assert server.tv_episodes.count_documents({"tmdbId": 4301}) == 1
+    assert server.catalog_rebuild_state.count_documents({}) == 0
+
+
+def test_recovery_drops_the_shadows_of_an_abandoned_build(server, catalog):
+    server.contents.insert_one({"tmdbId": 4302, "type": "movie", "title": "Live"})
+    fill_shadows(server, 4302)
+    mark(server, "building", heartbeat_age=server.CATALOG_REBUILD_LEASE_SECONDS + 60)
+
+    server.recover_catalog_swap()
+
+    names = server.db.list_collection_names()
+    assert not [name for name in names if name.endswith(server.SHADOW_SUFFIX)]
+    assert server.contents.find_one({"tmdbId": 4302})["title"] == "Live"
+    assert server.catalog_rebuild_state.count_documents({}) == 0
+
+
+def test_recovery_leaves_a_running_build_alone(server, catalog):
+    fill_shadows(server, 4303)
+    mark(server, "building")
+
+    server.recover_catalog_swap()
+
+    assert server.db["contents__shadow"].count_documents({}) == 1
+    assert server.claim_catalog_rebuild() is False
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(server.rebuild_catalog_shadow([{"tmdbId": 4303, "type": "movie"}]))
+    assert exc.value.status_code == 409
+
+
+def test_stale_build_can_be_taken_over(server, catalog):
+    mark(server, "building", heartbeat_age=server.CATALOG_REBUILD_LEASE_SECONDS + 60)
+    assert server.claim_catalog_rebuild() is True
+    assert server.claim_catalog_rebuild() is False
+
+
+def test_rebuild_swaps_in_and_keeps_failed_titles(server, catalog, monkeypatch):
+    server.contents.delete_many({})
+    server.contents.insert_many([
+        {"tmdbId": 4304, "type": "movie", "title": "Old movie"},
+        {"tmdbId": 4305, "type": "tv", "title": "Old show"}
+    ])
+    server.tv_seasons.insert_one({"tmdbId": 4305, "seasonNumber": 1})
+
+    async def import_content_from_tmdb(tmdb_id, content_type):
+        if tmdb_id == 4305:
+            raise RuntimeError("TMDB down")
+        return {"tmdbId": tmdb_id, "type": content_type, "title": "New movie"}
+
+    monkeypatch.setattr(server, "import_content_from_tmdb", import_content_from_tmdb)
+    existing = list(server.contents.find({}, {"tmdbId": 1, "type": 1, "_id": 0}))
+
+    assert asyncio.run(server.rebuild_catalog_shadow(existing)) == 1
+
+    assert server.contents.find_one({"tmdbId": 4304})["title"] == "New movie"
+    assert server.contents.find_one({"tmdbId": 4305})["title"] == "Old show"
+    assert server.tv_seasons.count_documents({"tmdbId": 4305}) == 1
+    names = server.db.list_collection_names()
+    assert not [name for name in names if name.endswith(server.SHADOW_SUFFIX)]
+    assert server.catalog_rebuild_state.count_documents({}) == 0
@@ -0,0 +1,53 @@
+import pytest
+
+
+def test_migration_runs_once(server):
+    calls = []
+    server.run_migration_once("test_runs_once", lambda: calls.append(1) or {"n": 1})
+    server.run_migration_once("test_runs_once", lambda: calls.append(1) or {"n": 1})
+
+    assert calls == [1]
+    assert server.schema_migrations.find_one({"_id": "test_runs_once"})["result"] == {"n": 1}
+
+
+def test_migration_skips_while_another_worker_holds_the_lock(server):
+    server.schema_migrations.insert_one({"_id": "test_locked", "startedAt": "2026-01-01T00:00:00+00:00"})
+    calls = []
+    server.run_migration_once("test_locked", lambda: calls.append(1) or {})
+
+    assert calls == []
+    assert "completedAt" not in server.schema_migrations.find_one({"_id": "test_locked"})
+
+
+def failing_migration():
+    raise RuntimeError("primary stepped down")
+
+
+def test_failed_idempotent_migration_is_retried(server):
+    with pytest.raises(RuntimeError):
+        server.run_migration_once("test_retry", failing_migration, idempotent=True)
+    assert server.schema_migrations.find_one({"_id": "test_retry"})["error"] == "primary stepped down"
+
+    server.run_migration_once("test_retry", lambda: {"n": 2}, idempotent=True)
+
+    marker = server.schema_migrations.find_one({"_id": "test_retry"})
+    assert marker["result"] == {"n": 2}
+    assert "error" not in marker
+
+
+def test_failed_migration_is_not_retried_unless_idempotent(server):
+    with pytest.raises(RuntimeError):
+        server.run_migration_once("test_no_retry", failing_migration)
+    calls = []
+    server.run_migration_once("test_no_retry", lambda: calls.append(1) or {})
+
+    assert calls == []
+
+
+def test_abandoned_idempotent_migration_is_taken_over_after_the_lease(server):
+    server.schema_migrations.insert_one({"_id": "test_abandoned", "startedAt": "2000-01-01T00:00:00+00:00"})
+    calls = []
+    server.run_migration_once("test_abandoned", lambda: calls.append(1) or {}, idempotent=True)
+
+    assert calls == [1]
+    assert "completedAt" in server.schema_migrations.find_one({"_id": "test_abandoned"})
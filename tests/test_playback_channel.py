@@ -0,0 +1,64 @@
+import pytest
+from fastapi.testclient import TestClient
+from pymongo.errors import AutoReconnect
+from starlette.websockets import WebSocketDisconnect
+
+
+@pytest.fixture(scope="module")
+def client(server):
+    return TestClient(server.app)
+
+
+@pytest.fixture(scope="module")
+def token(client):
+    response = client.post(
+        "/api/auth/register",
+        json={"email": "player@example.com", "password": "correct horse", "name": "Player"}
+    )
+    return response.json()["token"]
+
+
+def progress(seq, **fields):
+    return {"type": "progress", "seq": seq, "tmdb_id": 550, "media_type": "movie", "progress": 120, "duration": 7200, **fields}
+
+
+def test_bad_token_is_rejected_with_4401_after_the_handshake(client):
+    with client.websocket_connect("/api/ws/playback") as websocket:
+        websocket.send_json({"type": "auth", "token": "not-a-jwt"})
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+    assert closed.value.code == 4401
+
+
+def test_events_before_auth_are_rejected(client):
+    with client.websocket_connect("/api/ws/playback") as websocket:
+        websocket.send_json(progress(1))
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+    assert closed.value.code == 4401
+
+
+def test_non_finite_progress_is_an_error_not_a_save(client, token):
+    with client.websocket_connect("/api/ws/playback") as websocket:
+        websocket.send_json({"type": "auth", "token": token})
+        assert websocket.receive_json() == {"type": "auth", "status": "ok"}
+        websocket.send_text('{"type": "progress", "seq": 1, "tmdb_id": 550, "media_type": "movie", "progress": NaN, "duration": 7200}')
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_json(progress(2, duration=float("inf")))
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_json(progress(3))
+        assert websocket.receive_json() == {"type": "ack", "seq": 3, "status": "saved"}
+
+
+def test_database_errors_fail_the_event_not_the_socket(server, client, token, monkeypatch):
+    def unavailable(user_id, update):
+        raise AutoReconnect("primary stepped down")
+
+    monkeypatch.setattr(server, "record_watch_progress", unavailable)
+    with client.websocket_connect("/api/ws/playback") as websocket:
+        websocket.send_json({"type": "auth", "token": token})
+        websocket.receive_json()
+        websocket.send_json(progress(1))
+        assert websocket.receive_json()["status"] == "unavailable"
+        websocket.send_json({"type": "view", "seq": 2, "tmdb_id": 550, "media_type": "movie"})
+        assert websocket.receive_json() == {"type": "ack", "seq": 2, "status": "recorded"}
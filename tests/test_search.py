@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(server):
+    return TestClient(server.app)
+
+
+@pytest.mark.parametrize("limit", [0, -1, 101])
+def test_search_rejects_out_of_range_limit(client, limit):
+    assert client.get("/api/public/search", params={"q": "batman", "limit": limit}).status_code == 422
+
+
+def test_local_search_total_counts_every_match(server):
+    matches = [{"tmdbId": i, "type": "movie", "title": f"Batman {i}", "available": True} for i in range(1, 26)]
+    matches.append({"tmdbId": 99, "type": "movie", "title": "Batman 99", "available": False})
+
+    result = asyncio.run(server.search_local_catalog(matches, 1, 10, verify_vixsrc=False))
+
+    assert len(result["items"]) == 10
+    assert result["total"] == 25
+    assert result["totalPages"] == 3
+
+
+@pytest.mark.parametrize("limit", [0, 101])
+def test_section_rejects_out_of_range_limit(client, limit):
+    response = client.get("/api/public/contents/by-section/popular/movie", params={"limit": limit, "cursor": ""})
+    assert response.status_code == 422
+
+
+def test_fill_from_tmdb_walks_a_bounded_number_of_pages(server, monkeypatch):
+    fetched = []
+    checked = []
+
+    async def fetch_tmdb_data(endpoint, params=None):
+        fetched.append(params["page"])
+        return {"results": [{"id": params["page"] * 100 + i} for i in range(20)], "total_pages": 500}
+
+    async def check_vixsrc_with_cache(tmdb_id, media_type):
+        checked.append(tmdb_id)
+        return False
+
+    monkeypatch.setattr(server, "fetch_tmdb_data", fetch_tmdb_data)
+    monkeypatch.setattr(server, "check_vixsrc_with_cache", check_vixsrc_with_cache)
+
+    collected, position = asyncio.run(server.fill_from_tmdb(
+        "/movie/popular", {}, lambda item: "movie", {"p": 1, "o": 0}, 20, True
+    ))
+
+    pages = server.TMDB_MAX_PAGES_PER_REQUEST
+    assert collected == []
+    assert sorted(set(fetched)) == list(range(1, pages + 1))
+    assert len(checked) == pages * 20
+    assert position == {"p": pages + 1, "o": 0}
+
+
+def test_short_queries_match_word_starts_from_the_prefix_postings(server):
+    index = server.CatalogSearchIndex(server.db["test_search_catalog_short"])
+    index.add({"id": 1, "title": "Batman Begins", "popularity": 10}, "movie")
+    index.add({"id": 2, "title": "Barbie", "popularity": 20}, "movie")
+    index.add({"id": 3, "title": "Plan B", "popularity": 5}, "movie")
+
+    assert [m["tmdbId"] for m in index.search("ba")] == [2, 1]
+    assert [m["tmdbId"] for m in index.search("b")] == [2, 1, 3]
+    assert [m["tmdbId"] for m in index.search("be")] == [1]
+
+    index.add({"id": 1, "title": "The Batman", "popularity": 10}, "movie")  # retitled
+    assert index.search("be") == []
+    assert [m["tmdbId"] for m in index.search("th")] == [1]
+
+
+def test_local_cursor_survives_titles_added_between_pages(server):
+    index = server.CatalogSearchIndex(server.db["test_search_catalog_cursor"])
+    for tmdb_id in range(1, 6):
+        index.add({"id": tmdb_id, "title": f"Batman {tmdb_id}", "popularity": tmdb_id}, "movie", available=True)
+
+    first, rank = asyncio.run(server.search_local_from(index.search("batman"), None, 2, verify_vixsrc=False))
+    index.add({"id": 99, "title": "Batman 99", "popularity": 99}, "movie", available=True)  # ranks first
+    position = server.decode_cursor(server.encode_cursor({"src": "local", "k": list(rank)}))
+    second, _ = asyncio.run(server.search_local_from(
+        index.search("batman"), server.search_cursor_rank(position), 2, verify_vixsrc=False
+    ))
+
+    assert [m["tmdbId"] for _, m in first] == [5, 4]
+    assert [m["tmdbId"] for _, m in second] == [3, 2]
+
+
+def test_tmdb_cursor_results_feed_the_local_index(server, client, monkeypatch):
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {"total_pages": 1, "results": [
+                {"id": 31337, "media_type": "movie", "title": "Zyzzyva Returns", "popularity": 1}
+            ]}
+
+    async def get(self, url, params=None):
+        return Response()
+
+    monkeypatch.setattr(server.httpx.AsyncClient, "get", get)
+    response = client.get("/api/public/search", params={"q": "zyzzyva", "cursor": "", "verify_vixsrc": False})
+
+    assert [item["tmdbId"] for item in response.json()["items"]] == [31337]
+    assert [m["tmdbId"] for m in server.catalog_search_index.search("zyzzyva")] == [31337]
+
+
+def test_malformed_local_cursor_is_rejected(client, server):
+    cursor = server.encode_cursor({"src": "local", "k": "nope"})
+    response = client.get("/api/public/search", params={"q": "batman", "cursor": cursor})
+    assert response.status_code == 400
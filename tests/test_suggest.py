@@ -0,0 +1,45 @@
+import pytest
+
+TITLES = ["Plan B", "Batman Begins", "Barbie", "It", "The Italian Job", "Rocky 2", "2001 Odissea nello spazio"]
+
+
+class StaticIndex:
+    def __init__(self, server, titles):
+        self.entries = [
+            (f"movie:{tmdb_id}", {
+                "tmdbId": tmdb_id,
+                "type": "movie",
+                "title": title,
+                "title_normalized": [server.normalize_title(title)],
+                "popularity": tmdb_id
+            })
+            for tmdb_id, title in enumerate(titles, start=1)
+        ]
+
+    def snapshot(self):
+        return 1, self.entries
+
+
+@pytest.fixture
+def suggester(server):
+    suggester = server.TitleSuggester(StaticIndex(server, TITLES))
+    suggester.refresh()
+    return suggester
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("b", {"Plan B", "Batman Begins", "Barbie"}),
+    ("ba", {"Batman Begins", "Barbie"}),
+    ("bat", {"Batman Begins"}),
+    ("it", {"It", "The Italian Job"}),
+    ("ita", {"The Italian Job"}),
+    ("2", {"Rocky 2", "2001 Odissea nello spazio"}),
+    ("20", {"2001 Odissea nello spazio"}),
+    ("batm", {"Batman Begins"}),
+])
+def test_prefixes_past_a_shorter_phrase_still_match(suggester, query, expected):
+    assert {item["title"] for item in suggester.suggest(query, 10)} == expected
+
+
+def test_suggestions_are_ranked_by_popularity(suggester):
+    assert [item["title"] for item in suggester.suggest("b", 10)] == ["Barbie", "Batman Begins", "Plan B"]
@@ -0,0 +1,43 @@
+import asyncio
+
+
+def trending(*ids):
+    return {"results": [{"id": tmdb_id, "media_type": "movie", "title": f"Movie {tmdb_id}"} for tmdb_id in ids]}
+
+
+def test_padded_snapshot_is_rebuilt_with_fresh_trending(server, monkeypatch):
+    responses = [None, trending(*range(101, 111)), trending(*range(201, 211))]
+
+    async def fetch_tmdb_data(endpoint, params=None):
+        return responses.pop(0)
+
+    monkeypatch.setattr(server, "fetch_tmdb_data", fetch_tmdb_data)
+    monkeypatch.setattr(server, "rank_top_viewed", lambda window_days, limit: [])
+    server.top10_snapshots.delete_many({})
+
+    # TMDB down: an empty snapshot must not be served forever
+    assert asyncio.run(server.compute_top10_snapshot("views"))["items"] == []
+    first = asyncio.run(server.compute_top10_snapshot("views"))
+    assert [item["tmdbId"] for item in first["items"]] == list(range(101, 111))
+    second = asyncio.run(server.compute_top10_snapshot("views"))
+    assert [item["tmdbId"] for item in second["items"]] == list(range(201, 211))
+
+
+def test_full_ranking_reuses_enriched_items(server, monkeypatch):
+    ranked = [{"tmdbId": tmdb_id, "type": "movie", "views": 100 - tmdb_id} for tmdb_id in range(1, 11)]
+    enriched = []
+
+    async def enrich_ranked_titles(rows, limit):
+        enriched.append(rows)
+        return [server.top10_item(row["tmdbId"], row["type"], {}, row["views"]) for row in rows[:limit]]
+
+    monkeypatch.setattr(server, "enrich_ranked_titles", enrich_ranked_titles)
+    monkeypatch.setattr(server, "rank_top_viewed", lambda window_days, limit: [dict(row) for row in ranked])
+    server.top10_snapshots.delete_many({})
+
+    asyncio.run(server.compute_top10_snapshot("views"))
+    ranked[0]["views"] = 500
+    snapshot = asyncio.run(server.compute_top10_snapshot("views"))
+
+    assert len(enriched) == 1
+    assert snapshot["items"][0]["views"] == 500
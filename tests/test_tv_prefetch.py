@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def known_show(server):
+    server.tv_series_meta.update_one({"tmdbId": 7001}, {"$set": {"tmdbId": 7001, "season_count": 2}}, upsert=True)
+    return 7001
+
+
+def test_jobs_are_deduplicated_and_dropped_when_the_queue_is_full(server):
+    async def scenario():
+        prefetcher = server.TvPrefetcher(max_size=2)
+        assert prefetcher.schedule(("season", 7001, 2))
+        assert not prefetcher.schedule(("season", 7001, 2))
+        assert prefetcher.schedule(("season", 7002, 2))
+        assert not prefetcher.schedule(("season", 7003, 2))
+        return prefetcher.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["scheduled"], stats["deduplicated"], stats["dropped"]) == (2, 1, 1)
+
+
+def test_only_known_seasons_are_scheduled(server, known_show, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(server.tv_prefetcher, "schedule", lambda job: scheduled.append(job) or True)
+
+    assert asyncio.run(server.schedule_next_episode(known_show, 2, 5))
+    assert not asyncio.run(server.schedule_next_episode(known_show, 3, 1))
+    assert not asyncio.run(server.schedule_next_episode(known_show, 0, 1))
+    assert not asyncio.run(server.schedule_next_episode(424242, 1, 1))
+    assert scheduled == [("episode", known_show, 2, 6)]
+
+
+@pytest.mark.parametrize("season, warmed", [(1, [(7001, 2)]), (2, [])])
+def test_finale_warms_the_next_season_only_if_there_is_one(server, known_show, monkeypatch, season, warmed):
+    calls = []
+
+    async def load_tv_season(tmdb_id, season_number):
+        return {"episodes": [{"episode_number": 1}, {"episode_number": 2}]}
+
+    async def warm_season(tmdb_id, season_number):
+        calls.append((tmdb_id, season_number))
+
+    prefetcher = server.TvPrefetcher(max_size=4)
+    monkeypatch.setattr(server, "load_tv_season", load_tv_season)
+    monkeypatch.setattr(prefetcher, "warm_season", warm_season)
+
+    asyncio.run(prefetcher.run_job(("episode", known_show, season, 3)))
+
+    assert calls == warmed
+
+
+def test_playback_start_needs_a_signed_in_user(server):
+    response = TestClient(server.app).post(
+        "/api/public/playback/start",
+        json={"tmdb_id": 7001, "media_type": "tv", "season": 1, "episode": 1}
+    )
+    assert response.status_code in (401, 403)
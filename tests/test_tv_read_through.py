@@ -0,0 +1,116 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+def show(tmdb_id, seasons):
+    return {
+        "id": tmdb_id,
+        "name": f"Show {tmdb_id}",
+        "status": "Returning Series",
+        "in_production": True,
+        "seasons": [{"season_number": n, "name": f"Season {n}", "episode_count": 2} for n in seasons]
+    }
+
+
+def season(number, episodes):
+    return {"name": f"Season {number}", "air_date": "2020-01-01", "episodes": [
+        {"episode_number": n, "name": f"Episode {n}", "air_date": "2020-01-01"} for n in episodes
+    ]}
+
+
+@pytest.fixture
+def tmdb(server, monkeypatch):
+    """Scripted TMDB: endpoint -> payload (None = TMDB down); records the calls"""
+    responses = {}
+    calls = []
+
+    async def fetch_tmdb_data(endpoint, params=None):
+        calls.append(endpoint)
+        return responses.get(endpoint)
+
+    monkeypatch.setattr(server, "fetch_tmdb_data", fetch_tmdb_data)
+    responses["calls"] = calls
+    return responses
+
+
+def test_series_is_fetched_once_then_served_fresh(server, tmdb):
+    tmdb["/tv/9001"] = show(9001, [1, 2])
+
+    meta, seasons = asyncio.run(server.load_tv_series(9001))
+    assert [s["season_number"] for s in seasons] == [1, 2]
+    asyncio.run(server.load_tv_series(9001))
+
+    assert tmdb["calls"] == ["/tv/9001"]
+
+
+def test_stale_series_is_refreshed_and_removed_seasons_deleted(server, tmdb):
+    tmdb["/tv/9002"] = show(9002, [1, 2, 3])
+    asyncio.run(server.load_tv_series(9002))
+    server.tv_episodes.insert_one({"tmdbId": 9002, "season_number": 3, "episode_number": 1})
+    stale = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+    server.tv_series_meta.update_one({"tmdbId": 9002}, {"$set": {"fetchedAt": stale}})
+
+    tmdb["/tv/9002"] = show(9002, [1, 2])
+    meta, seasons = asyncio.run(server.load_tv_series(9002))
+
+    assert [s["season_number"] for s in seasons] == [1, 2]
+    assert meta["season_count"] == 2
+    assert server.tv_episodes.count_documents({"tmdbId": 9002, "season_number": 3}) == 0
+
+
+def test_stale_data_is_served_while_tmdb_is_down(server, tmdb):
+    tmdb["/tv/9003"] = show(9003, [1])
+    tmdb["/tv/9003/season/1"] = season(1, [1, 2])
+    asyncio.run(server.load_tv_series(9003))
+    asyncio.run(server.load_tv_season(9003, 1))
+    stale = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+    server.tv_series_meta.update_one({"tmdbId": 9003}, {"$set": {"fetchedAt": stale}})
+    server.tv_seasons.update_one({"tmdbId": 9003, "season_number": 1}, {"$set": {"episodesFetchedAt": stale}})
+
+    tmdb.clear()
+    tmdb["calls"] = []
+    meta, seasons = asyncio.run(server.load_tv_series(9003))
+    cached = asyncio.run(server.load_tv_season(9003, 1))
+
+    assert [s["season_number"] for s in seasons] == [1]
+    assert [ep["episode_number"] for ep in cached["episodes"]] == [1, 2]
+    assert asyncio.run(server.load_tv_season(9003, 2)) is None
+
+
+def test_refreshed_season_drops_episodes_tmdb_removed(server, tmdb):
+    tmdb["/tv/9004/season/1"] = season(1, [1, 2, 3])
+    asyncio.run(server.load_tv_season(9004, 1))
+    server.tv_seasons.update_one({"tmdbId": 9004, "season_number": 1}, {"$set": {"episodesFetchedAt": None}})
+
+    tmdb["/tv/9004/season/1"] = season(1, [1, 2])
+    asyncio.run(server.load_tv_season(9004, 1))
+
+    assert sorted(server.tv_episodes.distinct("episode_number", {"tmdbId": 9004})) == [1, 2]
+
+
+def test_nothing_is_cached_during_a_catalog_rebuild(server, tmdb, monkeypatch):
+    monkeypatch.setitem(server.catalog_rebuild, "running", True)
+    tmdb["/tv/9005"] = show(9005, [1, 2])
+    tmdb["/tv/9005/season/1"] = season(1, [1])
+
+    meta, seasons = asyncio.run(server.load_tv_series(9005))
+    episodes = asyncio.run(server.load_tv_season(9005, 1))["episodes"]
+
+    assert [s["season_number"] for s in seasons] == [1, 2]
+    assert len(episodes) == 1
+    assert server.tv_seasons.count_documents({"tmdbId": 9005}) == 0
+    assert server.tv_episodes.count_documents({"tmdbId": 9005}) == 0
+
+
+def test_admin_stats_count_managed_shows_only(server, tmdb):
+    server.stats_cache.clear()
+    baseline = server.get_stats(admin=None)
+    tmdb["/tv/9006"] = show(9006, [1, 2])
+    asyncio.run(server.load_tv_series(9006))  # browsed, not managed
+
+    server.stats_cache.clear()
+    stats = server.get_stats(admin=None)
+
+    assert stats["totalSeasons"] == baseline["totalSeasons"]
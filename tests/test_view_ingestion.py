@@ -0,0 +1,131 @@
+from collections import Counter
+from datetime import datetime, timezone
+
+import pytest
+from pydantic import ValidationError
+from pymongo.errors import AutoReconnect
+
+
+def test_view_record_rejects_ids_outside_int64(server):
+    with pytest.raises(ValidationError):
+        server.ViewRecord(tmdb_id=10**20, media_type="movie")
+    with pytest.raises(ValidationError):
+        server.ViewRecord(tmdb_id=0, media_type="movie")
+    assert server.ViewRecord(tmdb_id=server.MAX_TMDB_ID, media_type="movie").tmdb_id == server.MAX_TMDB_ID
+
+
+def test_parse_playback_title_rejects_ids_outside_int64(server):
+    with pytest.raises(ValueError):
+        server.parse_playback_title({"tmdb_id": 10**20, "media_type": "movie"})
+    assert server.parse_playback_title({"tmdb_id": 550, "media_type": "tv"}) == (550, "tv")
+
+
+@pytest.mark.parametrize("tmdb_id", [550.0, 550.7, float("inf"), True, "550"])
+def test_parse_playback_title_requires_an_integer(server, tmdb_id):
+    with pytest.raises(TypeError):
+        server.parse_playback_title({"tmdb_id": tmdb_id, "media_type": "movie"})
+
+
+def test_flush_drops_unencodable_counter_and_writes_the_rest(server, monkeypatch):
+    monkeypatch.setattr(server, "VIEW_STORE", "counters")
+    collection = server.db["test_views_poisoned"]
+    ingestor = server.ViewIngestor(collection)
+    ingestor.add(10**20, "movie", count=3)
+    for tmdb_id in range(1, 551):
+        ingestor.add(tmdb_id, "movie")
+
+    ingestor.flush()
+
+    assert ingestor.stats()["pendingCounters"] == 0
+    assert ingestor.written == 550
+    assert ingestor.dropped == 3
+    assert sum(doc["views"] for doc in collection.find()) == 550
+
+
+def test_flush_retries_transient_failures_up_to_the_cap(server, monkeypatch):
+    monkeypatch.setattr(server, "VIEW_STORE", "counters")
+    ingestor = server.ViewIngestor(server.db["test_views_transient"])
+    calls = []
+
+    def unreachable(batch: Counter):
+        calls.append(batch)
+        raise AutoReconnect("primary stepped down")
+
+    monkeypatch.setattr(ingestor, "write_counters", unreachable)
+    ingestor.add(550, "movie", count=2)
+
+    for _ in range(server.VIEW_FLUSH_MAX_RETRIES):
+        ingestor.flush()
+        assert ingestor.stats()["pendingViews"] == 2
+    ingestor.flush()
+
+    assert len(calls) == server.VIEW_FLUSH_MAX_RETRIES + 1
+    assert ingestor.stats()["pendingViews"] == 0
+    assert ingestor.dropped == 2
+
+
+def test_view_sketches_expire_with_the_views(server):
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    assert server.merge_view_sketch("movie", 550, today, {server.viewer_hash("viewer")})
+
+    sketch = server.content_view_sketches.find_one({"tmdbId": 550, "date": today})
+    assert sketch["dayStart"].strftime("%Y-%m-%d") == today
+    ttl = server.content_view_sketches.index_information()["dayStart_1"]
+    assert ttl["expireAfterSeconds"] == server.VIEW_RETENTION_DAYS * 86400
+
+
+def test_viewer_id_identifies_viewers_sharing_a_proxy(server):
+    class ProxiedRequest:
+        client = type("Client", (), {"host": "10.0.0.1"})()
+        headers = {"user-agent": "Mozilla/5.0"}
+
+    request = ProxiedRequest()
+    assert server.viewer_fingerprint(request, "a1") != server.viewer_fingerprint(request, "b2")
+    assert server.viewer_fingerprint(request) == "10.0.0.1|Mozilla/5.0"
+    with pytest.raises(server.HTTPException):
+        server.viewer_fingerprint(request, "x" * (server.VIEWER_ID_MAX_LENGTH + 1))
+
+
+def test_beacon_size_limit_holds_without_content_length(server, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(server, "VIEW_BEACON_MAX_BYTES", 1024)
+
+    def chunks():
+        yield b"["
+        for _ in range(200):
+            yield b'{"tmdb_id": 550, "media_type": "movie"},'
+        yield b"{}]"
+
+    response = TestClient(server.app).post("/api/public/views/beacon", content=chunks())
+    assert response.status_code == 413
+
+
+def test_events_are_stamped_with_the_day_they_were_counted_for(server, monkeypatch):
+    monkeypatch.setattr(server, "VIEW_STORE", "timeseries")
+    events = server.db["test_view_events_day"]
+    monkeypatch.setattr(server, "content_view_events", events)
+    ingestor = server.ViewIngestor(server.db["test_views_unused"])
+    ingestor._pending[("movie", 550, "2026-10-18")] = 4  # counted just before midnight
+
+    ingestor.flush()
+
+    assert events.find_one()["ts"].strftime("%Y-%m-%d %H:%M") == "2026-10-18 00:00"
+
+
+def test_both_stores_rank_the_same_calendar_window(server, monkeypatch):
+    counters = server.db["test_window_counters"]
+    events = server.db["test_window_events"]
+    monkeypatch.setattr(server, "content_views", counters)
+    monkeypatch.setattr(server, "content_view_events", events)
+    for days_ago, tmdb_id in [(6, 1), (7, 2)]:
+        day = server.view_window_start(days_ago + 1)
+        counters.insert_one({"tmdbId": tmdb_id, "type": "movie", "date": day.strftime("%Y-%m-%d"), "views": 1})
+        events.insert_one({"ts": day, "meta": {"type": "movie", "tmdbId": tmdb_id}, "views": 1})
+
+    ranked = {}
+    for store in ("counters", "timeseries"):
+        monkeypatch.setattr(server, "VIEW_STORE", store)
+        ranked[store] = [row["tmdbId"] for row in server.rank_top_viewed(7, 10)]
+
+    assert ranked["counters"] == ranked["timeseries"] == [1]